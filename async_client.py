@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import time
+import aiohttp
+import http_client
+import json_codec
+import metrics
+import tracing
+from auth import get_token, invalidate_token
+from rate_limiter import get_rate_limiter, retry_after_from, route_key
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 10
+
+class AsyncDiscordClient:
+    """asyncioでDiscord APIのメッセージ取得と既読処理を並行実行するクライアント"""
+
+    def __init__(self, config, concurrency=None):
+        """
+        コンストラクタ
+
+        Args:
+            config (dict): 設定情報
+            concurrency (int): 同時に実行するリクエスト数の上限
+        """
+        self.config = config
+        self.concurrency = concurrency or config.get('concurrency') or DEFAULT_CONCURRENCY
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._session = None
+
+    async def __aenter__(self):
+        connect_timeout, read_timeout = http_client.get_timeout(self.config)
+        self._session = aiohttp.ClientSession(
+            headers=http_client.DEFAULT_HEADERS,
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            timeout=aiohttp.ClientTimeout(connect=connect_timeout, sock_read=read_timeout)
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._session.close()
+        self._session = None
+
+    async def _get_token(self):
+        # TokenProviderはブロッキングなのでスレッドで実行する
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, get_token, self.config)
+
+    async def _request(self, method, path):
+        """トークンを付与してリクエストし、デコード済みのJSONを返す"""
+        url = f"{http_client.BASE_URL}{path}"
+        limiter = get_rate_limiter(self.config)
+        route = route_key(method, path)
+        max_retries = http_client.get_max_retries(self.config)
+        label = metrics.route_label(route[0])
+        token_refreshed = False
+        attempt = 0
+
+        while True:
+            token = await self._get_token()
+            await limiter.acquire_async(route)
+            async with self._semaphore:
+                start_time = time.perf_counter()
+                async with self._session.request(method, url, headers={"Authorization": token}) as response:
+                    duration = time.perf_counter() - start_time
+                    metrics.observe('http_request_seconds', duration, route=label)
+                    metrics.inc('http_requests_total', route=label, status=response.status)
+                    tracing.record('http.request', start_time, duration, route=label, status=response.status, attempt=attempt)
+                    limiter.update(route, response.headers)
+
+                    if response.status == 401 and not token_refreshed:
+                        logger.warning("トークンが拒否されました（401）。トークンを再取得します")
+                        metrics.inc('http_retries_total', route=label, reason='401')
+                        tracing.instant('http.unauthorized', route=label)
+                        invalidate_token(token)
+                        token_refreshed = True
+                        continue
+
+                    if response.status == 429:
+                        metrics.inc('http_rate_limited_total', route=label)
+                        tracing.instant('http.rate_limited', route=label)
+                    if response.status != 429 or attempt == max_retries:
+                        response.raise_for_status()
+                        if response.status == 204:
+                            return None
+                        return await response.json(loads=json_codec.loads, content_type=None)
+
+                    try:
+                        data = await response.json(loads=json_codec.loads, content_type=None)
+                    except ValueError:
+                        data = None
+                    retry_after, is_global = retry_after_from(response.headers, data)
+                    # 待機はRateLimiterが次回のacquire_asyncで行う
+                    limiter.on_rate_limited(route, retry_after, is_global)
+                    metrics.inc('http_retries_total', route=label, reason='429')
+                    attempt += 1
+
+    async def get_channel_messages(self, channel_id, limit=50):
+        """
+        Discordチャンネルからメッセージを取得する
+
+        Args:
+            channel_id (str): メッセージを取得するチャンネルのID
+            limit (int): 取得するメッセージの最大数
+
+        Returns:
+            list: メッセージオブジェクトのリスト
+        """
+        messages = await self._request('GET', f"/channels/{channel_id}/messages?limit={limit}")
+        logger.info(f"チャンネル {channel_id} から {len(messages)} 件のメッセージを取得しました")
+        return messages
+
+    async def mark_channel_as_read(self, channel_id, last_message_id):
+        """特定のメッセージまでDiscordチャンネルを既読にする"""
+        result = await self._request('POST', f"/channels/{channel_id}/messages/{last_message_id}/ack")
+        logger.info(f"チャンネル {channel_id} を正常に既読にしました")
+        return result
+
+    async def mark_latest_as_read(self, channel_id, read_state=None):
+        """
+        チャンネルの最新メッセージまで既読にする
+
+        Args:
+            channel_id (str): チャンネルID
+            read_state (ReadStateStore): 指定した場合、前回既読にした位置から変化がなければ既読処理を省略する
+
+        Returns:
+            tuple: (最新メッセージID（メッセージがない場合はNone）, 既読処理を省略したかどうか)
+        """
+        messages = await self.get_channel_messages(channel_id, limit=1)
+        if not messages:
+            logger.info(f"チャンネル {channel_id} にメッセージがありません")
+            return None, False
+        last_message_id = messages[0]['id']
+        if read_state is not None and read_state.is_unchanged(channel_id, last_message_id):
+            return last_message_id, True
+        await self.mark_channel_as_read(channel_id, last_message_id)
+        if read_state is not None:
+            read_state.set(channel_id, last_message_id, save=False)
+        return last_message_id, False
+
+async def mark_channels_as_read(config, channels, concurrency=None, read_state=None):
+    """
+    複数チャンネルを並行して既読にする
+
+    Args:
+        config (dict): 設定情報
+        channels (list): server_idとchannel_idを持つ辞書のリスト
+        concurrency (int): 同時に実行するリクエスト数の上限
+        read_state (ReadStateStore): チャンネルごとの既読位置
+
+    Returns:
+        list: チャンネルごとの結果（server_id, channel_id, success, skipped, elapsed, message_id）のリスト
+    """
+    async with AsyncDiscordClient(config, concurrency) as client:
+        async def process(channel):
+            start_time = time.time()
+            result = {
+                'server_id': channel['server_id'],
+                'channel_id': channel['channel_id'],
+                'success': False,
+                'skipped': False,
+                'message_id': None
+            }
+            try:
+                result['message_id'], result['skipped'] = await client.mark_latest_as_read(channel['channel_id'], read_state)
+                result['success'] = True
+            except Exception as e:
+                logger.error(f"チャンネル {channel['channel_id']} の既読処理に失敗しました: {e}")
+            result['elapsed'] = time.time() - start_time
+            return result
+
+        results = await asyncio.gather(*(process(channel) for channel in channels))
+
+    if read_state is not None:
+        read_state.save()
+    return results
@@ -3,17 +3,28 @@ import json
 import os
 import logging
 import time
+import threading
+import http_client
+import metrics
+import tracing
+from json_codec import decode_response
 
-# ロギング設定
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# ロギング設定（ハンドラーの設定は実行スクリプト側で行う）
 logger = logging.getLogger(__name__)
 
 # トークンキャッシュファイル
 TOKEN_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.token_cache')
 
+# メモリ上のトークンを再検証せずに使い続ける秒数
+DEFAULT_TOKEN_TTL = 600
+# ログインに失敗した後、再ログインを控える秒数（連続して失敗するたびに倍にする）
+DEFAULT_LOGIN_RETRY_DELAY = 60
+MAX_LOGIN_RETRY_DELAY = 3600
+
+class LoginCooldownError(Exception):
+    """ログインに失敗した後、再ログインを控えている間に送出される例外"""
+
+@metrics.instrument('auth.login')
 def login_to_discord(email, password):
     """
     Discordにメールアドレスとパスワードでログインし、トークンを取得する
@@ -37,12 +48,6 @@ def login_to_discord(email, password):
             return cached_token
         logger.warning("キャッシュされたトークンは無効です。再ログインします")
     
-    url = "https://discord.com/api/v9/auth/login"
-    headers = {
-        "Content-Type": "application/json",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
-    
     payload = {
         "login": email,
         "password": password,
@@ -53,10 +58,10 @@ def login_to_discord(email, password):
     }
     
     try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
+        response = http_client.request('POST', '/auth/login', data=json.dumps(payload))
         response.raise_for_status()
         
-        data = response.json()
+        data = decode_response(response)
         token = data.get('token')
         
         if not token:
@@ -81,15 +86,13 @@ def login_to_discord(email, password):
         logger.error(f"ログイン中にエラーが発生しました: {e}")
         raise
 
+@metrics.instrument('auth.verify_token')
 def verify_token(token):
     """トークンが有効かどうかを確認する"""
-    headers = {
-        "Authorization": token,
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
+    headers = {"Authorization": token}
     
     try:
-        response = requests.get("https://discord.com/api/v9/users/@me", headers=headers)
+        response = http_client.request('GET', '/users/@me', headers=headers)
         return response.status_code == 200
     except:
         return False
@@ -121,12 +124,150 @@ def cache_token(token):
     except Exception as e:
         logger.warning(f"トークンをキャッシュに保存できませんでした: {e}")
 
+class TokenProvider:
+    """
+    検証済みトークンをプロセス内で保持するクラス
+
+    トークンはTTLが切れるか401を受け取るまで再検証しない。
+    複数スレッドから同時に呼び出されても再ログインは1回だけ行われる。
+    ログインに失敗した場合は一定時間（連続して失敗するたびに倍）再ログインを行わず、
+    その間はLoginCooldownErrorを送出する（キャプチャ等で失敗し続けるアカウントで
+    チャンネルごとにログインを試みないため）。
+    """
+    
+    def __init__(self, ttl=DEFAULT_TOKEN_TTL, retry_delay=DEFAULT_LOGIN_RETRY_DELAY):
+        """
+        コンストラクタ
+        
+        Args:
+            ttl (float): 再検証までの秒数
+            retry_delay (float): ログインに失敗した後、再ログインを控える秒数
+        """
+        self.ttl = ttl
+        self.retry_delay = retry_delay
+        self._token = None
+        self._verified_at = 0.0
+        self._failed_at = None
+        self._failures = 0
+        self._lock = threading.Lock()
+    
+    def _is_fresh(self):
+        return self._token is not None and time.monotonic() - self._verified_at < self.ttl
+    
+    def _cooldown_remaining(self):
+        """再ログインを控える残り秒数を返す"""
+        if self._failed_at is None:
+            return 0.0
+        delay = min(self.retry_delay * 2 ** (self._failures - 1), MAX_LOGIN_RETRY_DELAY)
+        return max(0.0, self._failed_at + delay - time.monotonic())
+    
+    def login_blocked(self):
+        """ログインの失敗により、再ログインを控えている間かどうか"""
+        return self._token is None and self._cooldown_remaining() > 0
+    
+    def get(self, config):
+        """有効なトークンを返す（必要な場合のみ検証・ログインする）"""
+        if self._is_fresh():
+            return self._token
+        
+        with self._lock:
+            # ロック待ちの間に他のスレッドが更新済みの場合はそれを使う
+            if self._is_fresh():
+                return self._token
+            
+            if self._token and verify_token(self._token):
+                logger.debug("トークンを再検証しました")
+            else:
+                self._token = None
+                remaining = self._cooldown_remaining()
+                if remaining > 0:
+                    raise LoginCooldownError(f"ログインに失敗したため、あと{remaining:.0f}秒間は再ログインを行いません")
+                metrics.inc('token_logins_total')
+                try:
+                    self._token = login_to_discord(config['email'], config['password'])
+                except Exception:
+                    self._failures += 1
+                    self._failed_at = time.monotonic()
+                    metrics.inc('token_login_failures_total')
+                    logger.warning(f"ログインに失敗しました。{self._cooldown_remaining():.0f}秒間は再ログインを行いません")
+                    raise
+                self._failures = 0
+                self._failed_at = None
+            self._verified_at = time.monotonic()
+            return self._token
+    
+    def invalidate(self, token=None):
+        """
+        保持しているトークンを破棄する
+        
+        Args:
+            token (str): 破棄するトークン。指定した場合は保持中のトークンと一致するときのみ破棄する
+        """
+        with self._lock:
+            if token is None or token == self._token:
+                self._token = None
+                self._verified_at = 0.0
+
+_token_provider = None
+_token_provider_lock = threading.Lock()
+
+def get_token_provider(config=None):
+    """プロセス全体で共有するTokenProviderを取得する"""
+    global _token_provider
+    if _token_provider is None:
+        with _token_provider_lock:
+            if _token_provider is None:
+                ttl = (config or {}).get('token_ttl') or os.getenv('TOKEN_TTL')
+                retry_delay = (config or {}).get('login_retry_delay') or os.getenv('LOGIN_RETRY_DELAY')
+                _token_provider = TokenProvider(
+                    float(ttl) if ttl else DEFAULT_TOKEN_TTL,
+                    float(retry_delay) if retry_delay else DEFAULT_LOGIN_RETRY_DELAY
+                )
+    return _token_provider
+
+def login_blocked():
+    """ログインの失敗により、再ログインを控えている間かどうか"""
+    return _token_provider is not None and _token_provider.login_blocked()
+
 def get_token(config):
     """設定からトークンを取得する"""
     try:
-        # メールとパスワードからログイン
-        token = login_to_discord(config['email'], config['password'])
-        return token
+        return get_token_provider(config).get(config)
+    except LoginCooldownError:
+        raise
     except Exception as e:
         logger.error(f"認証エラー: {e}")
         raise
+
+def invalidate_token(token=None):
+    """メモリ上のトークンを破棄し、次回の取得時に再検証させる"""
+    get_token_provider().invalidate(token)
+
+def authorized_request(method, url, config, **kwargs):
+    """
+    トークンを付与してAPIリクエストを送信する
+
+    401を受け取った場合はトークンを破棄し、再取得したトークンで1回だけ再試行する。
+
+    Args:
+        method (str): HTTPメソッド
+        url (str): リクエスト先URL
+        config (dict): 設定情報
+        **kwargs: http_client.requestに渡す追加引数
+
+    Returns:
+        requests.Response: レスポンス
+    """
+    headers = dict(kwargs.pop('headers', None) or {})
+    for attempt in range(2):
+        token = get_token(config)
+        headers["Authorization"] = token
+        response = http_client.request(method, url, config=config, headers=headers, **kwargs)
+        if response.status_code != 401 or attempt == 1:
+            return response
+        logger.warning("トークンが拒否されました（401）。トークンを再取得します")
+        label = metrics.route_label(f"{method.upper()} {url}")
+        metrics.inc('http_retries_total', route=label, reason='401')
+        tracing.instant('http.unauthorized', route=label)
+        invalidate_token(token)
+    return response
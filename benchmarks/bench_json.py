@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+APIレスポンスのJSONデコード速度を比較するベンチマーク
+
+メッセージ一覧のレスポンス（1ページ100件）をインストール済みの各JSONライブラリで
+デコードし、1ページあたりの所要時間を比較する。--payloadで実際に記録した
+レスポンスを指定しない場合は、Discordの形式に沿ったペイロードを生成して使う。
+
+使用例:
+    python3 benchmarks/bench_json.py
+    python3 benchmarks/bench_json.py --payload recorded_messages.json --iterations 2000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_codec
+
+def make_message(rng, channel_id, message_id):
+    """Discordのメッセージオブジェクトに近い構造のデータを作成する"""
+    author_id = str(rng.randrange(10**17, 10**18))
+    return {
+        'id': str(message_id),
+        'type': 0,
+        'content': ''.join(rng.choice('あいうえおかきくけこabcdefghij ') for _ in range(rng.randrange(0, 200))),
+        'channel_id': channel_id,
+        'author': {
+            'id': author_id,
+            'username': f"user{rng.randrange(10000)}",
+            'avatar': '%032x' % rng.getrandbits(128),
+            'discriminator': '0',
+            'public_flags': 0,
+            'flags': 0,
+            'banner': None,
+            'accent_color': None,
+            'global_name': f"ユーザー{rng.randrange(10000)}",
+            'avatar_decoration_data': None,
+            'banner_color': None
+        },
+        'attachments': [],
+        'embeds': [
+            {
+                'type': 'rich',
+                'url': 'https://example.com/article',
+                'title': '埋め込みのタイトル',
+                'description': '埋め込みの説明文' * rng.randrange(1, 5),
+                'color': 5814783,
+                'thumbnail': {'url': 'https://example.com/thumb.png', 'width': 400, 'height': 400}
+            }
+        ] if rng.random() < 0.3 else [],
+        'mentions': [],
+        'mention_roles': [],
+        'pinned': False,
+        'mention_everyone': False,
+        'tts': False,
+        'timestamp': '2024-05-01T12:34:56.789000+00:00',
+        'edited_timestamp': None,
+        'flags': 0,
+        'components': [],
+        'reactions': [
+            {'emoji': {'id': None, 'name': '👍'}, 'count': rng.randrange(1, 20), 'me': False, 'burst_count': 0}
+        ] if rng.random() < 0.2 else []
+    }
+
+def make_page(size=100, seed=0):
+    rng = random.Random(seed)
+    channel_id = str(rng.randrange(10**17, 10**18))
+    start = rng.randrange(10**18, 2 * 10**18)
+    return [make_message(rng, channel_id, start - index) for index in range(size)]
+
+def available_decoders():
+    decoders = {'json': json.loads}
+    try:
+        import orjson
+        decoders['orjson'] = orjson.loads
+    except ImportError:
+        pass
+    try:
+        import ujson
+        decoders['ujson'] = ujson.loads
+    except ImportError:
+        pass
+    return decoders
+
+def main():
+    parser = argparse.ArgumentParser(description='JSONデコード速度のベンチマーク')
+    parser.add_argument('--payload', help='記録したレスポンス（JSONファイル）のパス')
+    parser.add_argument('--iterations', type=int, default=1000, help='デコードの繰り返し回数')
+    args = parser.parse_args()
+
+    if args.payload:
+        with open(args.payload, 'rb') as f:
+            data = f.read()
+    else:
+        data = json.dumps(make_page(), ensure_ascii=False).encode('utf-8')
+
+    print(f"ペイロード: {len(data) / 1024:.1f}KB, 繰り返し: {args.iterations}回, 使用中のバックエンド: {json_codec.BACKEND}")
+    baseline = None
+    for name, decode in available_decoders().items():
+        elapsed = min(timeit.repeat(lambda: decode(data), number=args.iterations, repeat=3))
+        per_page_us = elapsed / args.iterations * 1e6
+        if baseline is None:
+            baseline = per_page_us
+        print(f"{name:>8}: {per_page_us:10.1f} µs/ページ  ({baseline / per_page_us:.2f}倍)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+起動時間のベンチマーク
+
+cronや短命なコンテナから起動する場合に効いてくる、プロセス起動とモジュール読み込みの時間を計測する。
+各シナリオを別プロセスで繰り返し実行し、所要時間の中央値と最小値を表示する。
+--importtimeを指定すると、python -X importtimeの結果から読み込みに時間のかかったモジュールを表示する。
+
+使用例:
+    python3 benchmarks/bench_startup.py
+    python3 benchmarks/bench_startup.py --repeat 20 --importtime --top 15
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (名前, 実行するPythonの引数)
+SCENARIOS = [
+    ('python（空の起動）', ['-c', 'pass']),
+    ('main.py --help', [os.path.join(ROOT_DIR, 'main.py'), '--help']),
+    ('import read_strategy（rest/hybrid）', ['-c', 'import read_strategy']),
+    ('import async_client（async）', ['-c', 'import async_client']),
+    ('import selenium_manager（selenium）', ['-c', 'import selenium_manager']),
+]
+
+def run_once(python, args, workdir, extra_flags=()):
+    """
+    シナリオを1回実行する
+
+    Returns:
+        tuple: (所要時間（秒）, 終了コード, 標準エラー出力)
+    """
+    # 呼び出し元のPYTHONPATH（依存パッケージの場所など）は残したまま、リポジトリを先頭に追加する
+    pythonpath = os.environ.get('PYTHONPATH')
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT_DIR, pythonpath]) if pythonpath else ROOT_DIR)
+    start_time = time.perf_counter()
+    completed = subprocess.run([python, *extra_flags, *args], cwd=workdir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return time.perf_counter() - start_time, completed.returncode, completed.stderr
+
+def parse_importtime(stderr, top):
+    """-X importtimeの出力から累積時間の大きいモジュールを返す"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        try:
+            _, self_us, cumulative_us, name = (part.strip() for part in line.replace('import time:', '|', 1).split('|'))
+            entries.append((int(cumulative_us), int(self_us), name))
+        except ValueError:
+            continue
+    entries.sort(reverse=True)
+    return entries[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description='起動時間のベンチマーク')
+    parser.add_argument('--repeat', type=int, default=10, help='各シナリオの実行回数')
+    parser.add_argument('--python', default=sys.executable, help='計測に使うPythonインタプリタ')
+    parser.add_argument('--importtime', action='store_true', help='読み込みに時間のかかったモジュールを表示する')
+    parser.add_argument('--top', type=int, default=10, help='--importtimeで表示するモジュール数')
+    args = parser.parse_args()
+
+    # main.pyはカレントディレクトリにログファイルを作成するため、一時ディレクトリで実行する
+    workdir = tempfile.mkdtemp(prefix='discord_startup_')
+    print(f"Python: {args.python}（各{args.repeat}回）")
+    print()
+    print(f"{'シナリオ':<40} {'中央値(ms)':>11} {'最小(ms)':>9}")
+
+    for name, scenario_args in SCENARIOS:
+        # 初回はバイトコードの生成を含むため計測から除く
+        _, returncode, stderr = run_once(args.python, scenario_args, workdir)
+        if returncode != 0:
+            reason = stderr.strip().splitlines()[-1] if stderr.strip() else f"終了コード {returncode}"
+            print(f"{name:<40} {'失敗':>11}  {reason}")
+            continue
+
+        timings = [run_once(args.python, scenario_args, workdir)[0] for _ in range(args.repeat)]
+        print(f"{name:<40} {statistics.median(timings) * 1000:>11.1f} {min(timings) * 1000:>9.1f}")
+
+        if args.importtime:
+            _, _, stderr = run_once(args.python, scenario_args, workdir, ('-X', 'importtime'))
+            for cumulative_us, self_us, module in parse_importtime(stderr, args.top):
+                print(f"    {cumulative_us / 1000:>8.1f}ms（自身 {self_us / 1000:>6.1f}ms） {module.strip()}")
+
+if __name__ == '__main__':
+    main()
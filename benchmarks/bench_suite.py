@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+ローカルのDiscord代替サーバーを使った性能ベンチマーク
+
+fake_discord.FakeDiscordServerを起動し、scraper.py、mark_read.py、ChannelReader（API既読）、
+DiscordSeleniumManager（--selenium指定時）の各処理をチャンネル数分実行して、
+スループット、チャンネルあたりの所要時間（p50/p99）、1件あたりのリクエスト数を表示する。
+未読の判定については、チャンネルごとの確認とサーバーのチャンネル一覧による判定（GuildScanner）の
+1回の一括処理を比較する。
+
+使用例:
+    python3 benchmarks/bench_suite.py --channels 100 --latency 0.02
+    python3 benchmarks/bench_suite.py --channels 50 --rate-limit 0.1 --threads 8
+    python3 benchmarks/bench_suite.py --channels 10 --selenium --browser chrome
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_discord import FakeDiscordServer
+
+def percentile(values, p):
+    """値のリストからパーセンタイルを求める（最近傍法）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def run_scenario(name, channel_ids, process, server, threads=1):
+    """
+    チャンネルごとにprocessを実行し、所要時間とリクエスト数を集計する
+
+    Returns:
+        dict: 集計結果
+    """
+    before = server.state.snapshot()
+    timings = []
+    failures = 0
+
+    def measure(channel_id):
+        start_time = time.perf_counter()
+        try:
+            ok = process(channel_id) is not False
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"{name}: チャンネル {channel_id} で失敗しました: {e}")
+            ok = False
+        return time.perf_counter() - start_time, ok
+
+    start_time = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            outcomes = list(executor.map(measure, channel_ids))
+    else:
+        outcomes = [measure(channel_id) for channel_id in channel_ids]
+    total = time.perf_counter() - start_time
+
+    for elapsed, ok in outcomes:
+        timings.append(elapsed)
+        failures += 0 if ok else 1
+
+    after = server.state.snapshot()
+    requests_made = after.get('api', 0) - before.get('api', 0)
+    pages = after.get('web', 0) - before.get('web', 0)
+    return {
+        'name': name,
+        'channels': len(channel_ids),
+        'failures': failures,
+        'throughput': len(channel_ids) / total if total else 0.0,
+        'p50': percentile(timings, 50),
+        'p99': percentile(timings, 99),
+        'requests_per_channel': requests_made / len(channel_ids) if channel_ids else 0.0,
+        'pages_per_channel': pages / len(channel_ids) if channel_ids else 0.0,
+        'rate_limited': after.get('429', 0) - before.get('429', 0)
+    }
+
+def run_sweep_scenario(name, channel_count, sweep, server):
+    """
+    一括処理を1回実行し、全体の所要時間とリクエスト数を集計する（チャンネルごとの所要時間は計測しない）
+
+    Returns:
+        dict: 集計結果
+    """
+    before = server.state.snapshot()
+    start_time = time.perf_counter()
+    results = sweep()
+    total = time.perf_counter() - start_time
+    after = server.state.snapshot()
+    return {
+        'name': name,
+        'channels': channel_count,
+        'failures': sum(1 for result in results if not result['success']),
+        'throughput': channel_count / total if total else 0.0,
+        'p50': None,
+        'p99': None,
+        'requests_per_channel': (after.get('api', 0) - before.get('api', 0)) / channel_count if channel_count else 0.0,
+        'pages_per_channel': (after.get('web', 0) - before.get('web', 0)) / channel_count if channel_count else 0.0,
+        'rate_limited': after.get('429', 0) - before.get('429', 0)
+    }
+
+def format_ms(value):
+    return '-' if value is None else f"{value * 1000:.1f}"
+
+def print_report(results):
+    print()
+    print(f"{'シナリオ':<40} {'件数':>5} {'失敗':>4} {'件/秒':>8} {'p50(ms)':>9} {'p99(ms)':>9} {'API/件':>7} {'頁/件':>6} {'429':>5}")
+    for result in results:
+        print(
+            f"{result['name']:<40} {result['channels']:>5} {result['failures']:>4} "
+            f"{result['throughput']:>8.1f} {format_ms(result['p50']):>9} {format_ms(result['p99']):>9} "
+            f"{result['requests_per_channel']:>7.2f} {result['pages_per_channel']:>6.2f} {result['rate_limited']:>5}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description='ローカルの代替サーバーを使った性能ベンチマーク')
+    parser.add_argument('--channels', type=int, default=50, help='処理するチャンネル数')
+    parser.add_argument('--latency', type=float, default=0.01, help='代替サーバーの応答遅延（秒）')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='429を返す確率（0〜1）')
+    parser.add_argument('--limit', type=int, default=50, help='scraperで取得するメッセージ数')
+    parser.add_argument('--unread', type=float, default=0.1, help='未読判定シナリオで新着を作るチャンネルの割合（0〜1）')
+    parser.add_argument('--bulk-batch-size', type=int, default=100, help='一括既読のシナリオで1回に送るチャンネル数')
+    parser.add_argument('--threads', type=int, default=1, help='APIシナリオを並行実行するスレッド数')
+    parser.add_argument('--selenium', action='store_true', help='DiscordSeleniumManagerのシナリオも実行する')
+    parser.add_argument('--browser', default='chrome', help='Seleniumシナリオで使うブラウザ')
+    parser.add_argument('--trace', help='計測中のスパンを書き出すトレースファイルのパス')
+    parser.add_argument('--verbose', action='store_true', help='ツールのログを表示する')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    server = FakeDiscordServer(latency=args.latency, rate_limit_probability=args.rate_limit).start()
+    # 各モジュールはインポート時にベースURLを読み込むため、インポート前に設定する
+    os.environ['DISCORD_API_BASE'] = server.api_base_url
+    os.environ['DISCORD_WEB_BASE'] = server.base_url
+
+    import auth
+    import tracing
+    from scraper import get_channel_messages
+    from mark_read import BulkAcker, mark_channel_as_read
+    from read_strategy import ChannelReader
+    from read_state import ReadStateStore
+    from guild_scan import GuildScanner
+
+    # 実際のトークンキャッシュを上書きしないよう一時ファイルを使う
+    workdir = tempfile.mkdtemp(prefix='discord_bench_')
+    auth.TOKEN_CACHE_FILE = os.path.join(workdir, '.token_cache')
+
+    config = {
+        'email': 'bench@example.com',
+        'password': 'bench',
+        'mode': 'rest',
+        'browser': args.browser,
+        'headless': 'true'
+    }
+    channel_ids = [str(10**17 + index) for index in range(args.channels)]
+    results = []
+
+    print(f"代替サーバー: {server.base_url}（遅延 {args.latency * 1000:.0f}ms、429確率 {args.rate_limit:.0%}）")
+
+    if args.trace:
+        tracing.start(args.trace)
+
+    # トークンの取得（ログイン）は計測対象から除く
+    auth.get_token(config)
+
+    results.append(run_scenario(
+        f'scraper.get_channel_messages(limit={args.limit})', channel_ids,
+        lambda channel_id: get_channel_messages(channel_id, limit=args.limit, config=config),
+        server, args.threads
+    ))
+    results.append(run_scenario(
+        'mark_read.mark_channel_as_read', channel_ids,
+        lambda channel_id: mark_channel_as_read(channel_id, server.state.messages_for(channel_id)[0], config),
+        server, args.threads
+    ))
+
+    def bulk_ack_sweep():
+        with BulkAcker(config, max_batch_size=args.bulk_batch_size) as acker:
+            futures = [acker.add(channel_id, str(server.state.post_message(channel_id))) for channel_id in channel_ids]
+        return [future.result() for future in futures]
+
+    results.append(run_sweep_scenario(
+        f'mark_read.BulkAcker(batch={args.bulk_batch_size})', len(channel_ids),
+        bulk_ack_sweep, server
+    ))
+
+    for channel_id in channel_ids:
+        server.state.post_message(channel_id)
+    reader = ChannelReader(config)
+    results.append(run_scenario(
+        'ChannelReader(rest).mark_as_read', channel_ids,
+        lambda channel_id: reader.mark_as_read('1', channel_id)['success'],
+        server, args.threads
+    ))
+
+    # 未読の判定: 全チャンネルを既読にした状態から一部のチャンネルに新着を作り、1回の一括処理で既読にする
+    server.state.add_guild('1', channel_ids)
+    read_state = ReadStateStore(os.path.join(workdir, '.read_state'))
+    state_reader = ChannelReader(config, read_state=read_state)
+    unread_count = max(1, int(len(channel_ids) * args.unread))
+
+    def prepare_unread():
+        for channel_id in channel_ids:
+            read_state.set(channel_id, str(server.state.messages_for(channel_id)[0]), save=False)
+        for channel_id in channel_ids[:unread_count]:
+            server.state.post_message(channel_id)
+
+    prepare_unread()
+    results.append(run_sweep_scenario(
+        f'未読判定: チャンネルごと（未読 {unread_count}件）', len(channel_ids),
+        lambda: [state_reader.mark_as_read('1', channel_id) for channel_id in channel_ids],
+        server
+    ))
+    scanner = GuildScanner(config, read_state)
+
+    def scan_sweep():
+        pending, skipped = scanner.split_unread([{'server_id': '1', 'channel_id': channel_id} for channel_id in channel_ids])
+        return skipped + [state_reader.mark_as_read(channel['server_id'], channel['channel_id'], channel.get('last_message_id')) for channel in pending]
+
+    prepare_unread()
+    results.append(run_sweep_scenario(
+        f'未読判定: GuildScanner（未読 {unread_count}件）', len(channel_ids),
+        scan_sweep, server
+    ))
+
+    def scan_bulk_sweep():
+        pending, skipped = scanner.split_unread([{'server_id': '1', 'channel_id': channel_id} for channel_id in channel_ids])
+        return skipped + state_reader.mark_many_as_read(pending, BulkAcker(config, max_batch_size=args.bulk_batch_size))
+
+    prepare_unread()
+    results.append(run_sweep_scenario(
+        f'未読判定: GuildScanner+BulkAcker（未読 {unread_count}件）', len(channel_ids),
+        scan_bulk_sweep, server
+    ))
+
+    if args.selenium:
+        from selenium_manager import DiscordSeleniumManager
+        selenium_config = dict(config, mode='selenium')
+        manager = DiscordSeleniumManager(selenium_config)
+        try:
+            if not manager.login():
+                print("Seleniumシナリオ: 代替サーバーへのログインに失敗しました")
+            else:
+                for channel_id in channel_ids:
+                    server.state.post_message(channel_id)
+                results.append(run_scenario(
+                    'DiscordSeleniumManager.mark_as_read', channel_ids,
+                    lambda channel_id: manager.mark_as_read('1', channel_id),
+                    server
+                ))
+        finally:
+            manager.close()
+
+    tracing.stop()
+    print_report(results)
+    server.stop()
+
+if __name__ == '__main__':
+    main()
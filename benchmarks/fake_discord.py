@@ -0,0 +1,517 @@
+#!/usr/bin/env python3
+"""
+ベンチマーク・動作確認用のローカルDiscord代替サーバー
+
+Discord APIのうち本ツールが使うエンドポイント（/auth/login、/users/@me、
+/channels/{id}/messages、/ack、/read-states/ack-bulk、/guilds/{id}/channels）と、Selenium用のログインページ・チャンネルページ、
+gatewayモード用の最小限のゲートウェイ（/gateway、HELLO・READY・MESSAGE_CREATEのみ）を
+標準ライブラリだけで提供する。応答の遅延と429の発生確率を設定できる。
+
+単体で起動する場合:
+    python3 benchmarks/fake_discord.py --port 8765 --latency 0.02 --rate-limit 0.05
+
+起動後は以下の環境変数を設定して本ツールを実行する:
+    DISCORD_API_BASE=http://127.0.0.1:8765/api/v9
+    DISCORD_WEB_BASE=http://127.0.0.1:8765
+    DISCORD_GATEWAY_URL=ws://127.0.0.1:8765/gateway
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import socket
+import struct
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FAKE_TOKEN = 'fake-token'
+API_PREFIX = '/api/v9'
+DISCORD_EPOCH_MS = 1420070400000
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><body>
+<form id="login" onsubmit="event.preventDefault(); document.cookie='session=1; path=/'; location.href='/channels/@me';">
+  <input name="email" type="text">
+  <input name="password" type="password">
+  <button type="submit">ログイン</button>
+</form>
+</body></html>
+"""
+
+HOME_PAGE = """<!DOCTYPE html>
+<html><body>
+<nav data-list-id="guildsnav"></nav>
+<script>if (!document.cookie.includes('session=1')) location.href = '/login';</script>
+</body></html>
+"""
+
+CHANNEL_PAGE = """<!DOCTYPE html>
+<html><head><title>{channel_id}</title></head><body>
+<nav data-list-id="guildsnav"></nav>
+<h1 data-text-variant="heading-lg/semibold">channel-{channel_id}</h1>
+{unread}
+<ol data-list-id="chat-messages">{messages}</ol>
+<script>
+function markRead() {{
+  fetch('/_web/channels/{channel_id}/read', {{method: 'POST'}}).then(function() {{
+    var bar = document.getElementById('---new-messages-bar');
+    if (bar) bar.remove();
+    var button = document.getElementById('read-button');
+    if (button) button.remove();
+  }});
+}}
+// Discordと同様に、チャンネルを表示してしばらくすると既読になる
+if (document.getElementById('---new-messages-bar')) setTimeout(markRead, {auto_read_ms});
+</script>
+</body></html>
+"""
+
+UNREAD_MARKUP = """<div id="---new-messages-bar" class="newMessagesBar">新しいメッセージ</div>
+<button id="read-button" class="barButtonAlt" onclick="markRead()">既読にする</button>"""
+
+def make_snowflake(timestamp):
+    return ((int(timestamp * 1000) - DISCORD_EPOCH_MS) << 22) | random.getrandbits(22)
+
+class FakeDiscordState:
+    """代替サーバーが保持するチャンネルのメッセージと既読位置、リクエスト数"""
+
+    def __init__(self, messages_per_channel=200):
+        self.messages_per_channel = messages_per_channel
+        self.channels = {}
+        self.guilds = {}
+        self.read_states = {}
+        self.gateways = set()
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+    def messages_for(self, channel_id):
+        """チャンネルのメッセージID（新しい順）を返す（初回アクセス時に生成する）"""
+        with self.lock:
+            if channel_id not in self.channels:
+                now = time.time()
+                self.channels[channel_id] = sorted(
+                    (make_snowflake(now - index * 60) for index in range(self.messages_per_channel)),
+                    reverse=True
+                )
+            return self.channels[channel_id]
+
+    def post_message(self, channel_id):
+        """新着メッセージを追加する（未読を作る）"""
+        message_id = make_snowflake(time.time())
+        ids = self.messages_for(channel_id)
+        with self.lock:
+            ids.insert(0, message_id)
+            gateways = list(self.gateways)
+        for gateway in gateways:
+            gateway.dispatch('MESSAGE_CREATE', {'id': str(message_id), 'channel_id': str(channel_id), 'content': 'ベンチマーク用のメッセージ'})
+        return message_id
+
+    def add_guild(self, guild_id, channel_ids):
+        """サーバーとそのチャンネルを登録する（/guilds/{id}/channelsで返す）"""
+        with self.lock:
+            self.guilds.setdefault(str(guild_id), []).extend(str(channel_id) for channel_id in channel_ids)
+
+    def is_unread(self, channel_id):
+        ids = self.messages_for(channel_id)
+        return bool(ids) and self.read_states.get(channel_id, 0) < ids[0]
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counts)
+
+class FakeGatewayConnection:
+    """
+    ゲートウェイのWebSocket接続（1クライアント分）
+
+    HELLOの送信、IDENTIFYへのREADYの応答、ハートビートへのACKと、
+    post_messageで追加されたメッセージのMESSAGE_CREATEの配信だけを行う（RESUMEや圧縮には対応しない）。
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.sequence = 0
+        self._send_lock = threading.RLock()
+
+    def _send_frame(self, opcode, payload=b''):
+        header = bytes([0x80 | opcode])
+        if len(payload) < 126:
+            header += bytes([len(payload)])
+        elif len(payload) < 1 << 16:
+            header += bytes([126]) + struct.pack('>H', len(payload))
+        else:
+            header += bytes([127]) + struct.pack('>Q', len(payload))
+        with self._send_lock:
+            self.handler.wfile.write(header + payload)
+
+    def _read_frame(self):
+        """クライアントからのフレームを1つ読み込む（接続が閉じられた場合はNone）"""
+        rfile = self.handler.rfile
+        header = rfile.read(2)
+        if len(header) < 2:
+            return None
+        opcode, length = header[0] & 0x0F, header[1] & 0x7F
+        if length == 126:
+            length = struct.unpack('>H', rfile.read(2))[0]
+        elif length == 127:
+            length = struct.unpack('>Q', rfile.read(8))[0]
+        mask = rfile.read(4) if header[1] & 0x80 else b''
+        payload = rfile.read(length)
+        if mask:
+            payload = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+        return opcode, payload
+
+    def send_json(self, payload):
+        self._send_frame(0x1, json.dumps(payload).encode('utf-8'))
+
+    def dispatch(self, event, data):
+        """DISPATCH（op 0）のイベントを送信する"""
+        try:
+            with self._send_lock:
+                self.sequence += 1
+                self.send_json({'op': 0, 't': event, 's': self.sequence, 'd': data})
+        except OSError:
+            pass
+
+    def disconnect(self):
+        """クローズフレームを送らずに切断する（回線断の再現用）"""
+        try:
+            self.handler.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def serve(self):
+        state = self.handler.server.state
+        self.send_json({'op': 10, 'd': {'heartbeat_interval': self.handler.server.heartbeat_interval_ms}})
+        try:
+            while True:
+                frame = self._read_frame()
+                if frame is None:
+                    break
+                opcode, payload = frame
+                if opcode == 0x8:
+                    self._send_frame(0x8, payload[:2])
+                    break
+                if opcode == 0x9:
+                    self._send_frame(0xA, payload)
+                    continue
+                if opcode != 0x1:
+                    continue
+
+                message = json.loads(payload)
+                if message.get('op') == 1:
+                    state.count('gateway_heartbeat')
+                    self.send_json({'op': 11})
+                elif message.get('op') == 2:
+                    state.count('gateway_identify')
+                    if (message.get('d') or {}).get('token') != FAKE_TOKEN:
+                        # 4004: Authentication failed
+                        self._send_frame(0x8, struct.pack('>H', 4004))
+                        break
+                    with state.lock:
+                        state.gateways.add(self)
+                    self.dispatch('READY', {'v': 9, 'user': {'id': '1', 'username': 'bench'}, 'session_id': f'fake-{id(self)}'})
+        except (OSError, ValueError):
+            pass
+        finally:
+            with state.lock:
+                state.gateways.discard(self)
+
+class FakeDiscordHandler(BaseHTTPRequestHandler):
+    """代替サーバーのリクエストハンドラ"""
+
+    protocol_version = 'HTTP/1.1'
+    # ヘッダーと本文を別々に書き込むため、Nagleと遅延ACKの組み合わせで応答が数十ミリ秒止まるのを防ぐ
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def _send(self, status, body=b'', content_type='application/json', headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode('utf-8')
+        elif isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _rate_limit_headers(self, bucket):
+        return {
+            'X-RateLimit-Bucket': bucket,
+            'X-RateLimit-Limit': '50',
+            'X-RateLimit-Remaining': '49',
+            'X-RateLimit-Reset-After': '1.0'
+        }
+
+    def _handle_api(self, method, path, query):
+        self.state.count('api')
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if method == 'POST' and path == '/auth/login':
+            self._read_body()
+            self.state.count('login')
+            return self._send(200, {'token': FAKE_TOKEN, 'user_id': '1'})
+
+        if self.headers.get('Authorization') != FAKE_TOKEN:
+            self.state.count('401')
+            return self._send(401, {'message': '401: Unauthorized', 'code': 0})
+
+        if method == 'GET' and path == '/users/@me':
+            self.state.count('verify')
+            return self._send(200, {'id': '1', 'username': 'bench'})
+
+        # 429の注入
+        if random.random() < self.server.rate_limit_probability:
+            self.state.count('429')
+            retry_after = self.server.retry_after
+            return self._send(429, {'message': 'You are being rate limited.', 'retry_after': retry_after, 'global': False}, headers={
+                'Retry-After': str(retry_after),
+                'X-RateLimit-Bucket': 'fake',
+                'X-RateLimit-Limit': '50',
+                'X-RateLimit-Remaining': '0',
+                'X-RateLimit-Reset-After': str(retry_after)
+            })
+
+        match = re.fullmatch(r'/channels/(\d+)/messages', path)
+        if method == 'GET' and match:
+            self.state.count('messages')
+            channel_id = match.group(1)
+            ids = self.state.messages_for(channel_id)
+            limit = min(int(query.get('limit', ['50'])[0]), 100)
+            if 'before' in query:
+                before = int(query['before'][0])
+                page = [i for i in ids if i < before][:limit]
+            elif 'after' in query:
+                after = int(query['after'][0])
+                page = [i for i in ids if i > after][-limit:]
+            else:
+                page = ids[:limit]
+            messages = [{
+                'id': str(message_id),
+                'channel_id': channel_id,
+                'author': {'id': '2', 'username': 'someone'},
+                'content': 'ベンチマーク用のメッセージ',
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime(((message_id >> 22) + DISCORD_EPOCH_MS) / 1000)),
+                'embeds': [],
+                'attachments': []
+            } for message_id in page]
+            return self._send(200, messages, headers=self._rate_limit_headers('messages'))
+
+        if method == 'POST' and path == '/read-states/ack-bulk':
+            body = self._read_body()
+            if not self.server.bulk_ack_enabled:
+                return self._send(404, {'message': '404: Not Found', 'code': 0})
+            self.state.count('ack_bulk')
+            try:
+                read_states = json.loads(body)['read_states']
+                acks = [(str(item['channel_id']), int(item['message_id'])) for item in read_states]
+            except (ValueError, KeyError, TypeError):
+                return self._send(400, {'message': 'Invalid Form Body', 'code': 50035})
+            if not acks or len(acks) > self.server.max_bulk_ack:
+                return self._send(400, {'message': 'Invalid Form Body', 'code': 50035})
+            with self.state.lock:
+                for channel_id, message_id in acks:
+                    self.state.read_states[channel_id] = max(self.state.read_states.get(channel_id, 0), message_id)
+            return self._send(204, headers=self._rate_limit_headers('ack_bulk'))
+
+        match = re.fullmatch(r'/guilds/(\d+)/channels', path)
+        if method == 'GET' and match:
+            self.state.count('guild_channels')
+            channel_ids = self.state.guilds.get(match.group(1))
+            if channel_ids is None:
+                return self._send(404, {'message': 'Unknown Guild', 'code': 10004})
+            channels = []
+            for position, channel_id in enumerate(channel_ids):
+                ids = self.state.messages_for(channel_id)
+                channels.append({
+                    'id': channel_id,
+                    'type': 0,
+                    'guild_id': match.group(1),
+                    'name': f'channel-{channel_id}',
+                    'position': position,
+                    'last_message_id': str(ids[0]) if ids else None
+                })
+            return self._send(200, channels, headers=self._rate_limit_headers('guild_channels'))
+
+        match = re.fullmatch(r'/channels/(\d+)/messages/(\d+)/ack', path)
+        if method == 'POST' and match:
+            self._read_body()
+            self.state.count('ack')
+            channel_id, message_id = match.group(1), int(match.group(2))
+            with self.state.lock:
+                self.state.read_states[channel_id] = max(self.state.read_states.get(channel_id, 0), message_id)
+            return self._send(200, {'token': None}, headers=self._rate_limit_headers('ack'))
+
+        self._send(404, {'message': '404: Not Found', 'code': 0})
+
+    def _handle_web(self, method, path):
+        self.state.count('web')
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if path == '/login':
+            return self._send(200, LOGIN_PAGE, 'text/html; charset=utf-8')
+        if path == '/channels/@me':
+            return self._send(200, HOME_PAGE, 'text/html; charset=utf-8')
+
+        match = re.fullmatch(r'/channels/([^/]+)/(\d+)', path)
+        if method == 'GET' and match:
+            self.state.count('page')
+            channel_id = match.group(2)
+            ids = self.state.messages_for(channel_id)
+            messages = ''.join(f'<li id="chat-messages-{channel_id}-{i}">message {i}</li>' for i in ids[:50])
+            unread = UNREAD_MARKUP if self.state.is_unread(channel_id) else ''
+            page = CHANNEL_PAGE.format(channel_id=channel_id, unread=unread, messages=messages, auto_read_ms=self.server.auto_read_ms)
+            return self._send(200, page, 'text/html; charset=utf-8')
+
+        match = re.fullmatch(r'/_web/channels/(\d+)/read', path)
+        if method == 'POST' and match:
+            self._read_body()
+            self.state.count('web_read')
+            channel_id = match.group(1)
+            ids = self.state.messages_for(channel_id)
+            with self.state.lock:
+                self.state.read_states[channel_id] = ids[0] if ids else 0
+            return self._send(204)
+
+        self._send(404, 'Not Found', 'text/plain')
+
+    def _handle_gateway(self):
+        key = self.headers.get('Sec-WebSocket-Key')
+        if not key or self.headers.get('Upgrade', '').lower() != 'websocket':
+            return self._send(400, 'WebSocket upgrade required', 'text/plain')
+        self.state.count('gateway')
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode('ascii')).digest()).decode('ascii')
+        self.send_response(101, 'Switching Protocols')
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept)
+        self.end_headers()
+        self.close_connection = True
+        FakeGatewayConnection(self).serve()
+
+    def _dispatch(self, method):
+        parsed = urlparse(self.path)
+        if method == 'GET' and parsed.path == '/gateway':
+            self._handle_gateway()
+        elif parsed.path.startswith(API_PREFIX):
+            self._handle_api(method, parsed.path[len(API_PREFIX):], parse_qs(parsed.query))
+        else:
+            self._handle_web(method, parsed.path)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+class FakeDiscordServer(ThreadingHTTPServer):
+    """
+    ローカルのDiscord代替サーバー
+
+    Args:
+        port (int): 待ち受けるポート（0の場合は空いているポート）
+        latency (float): 各リクエストに加える遅延（秒）
+        rate_limit_probability (float): 429を返す確率（0〜1）
+        retry_after (float): 429で返す再試行までの秒数
+        messages_per_channel (int): チャンネルごとに生成するメッセージ数
+        auto_read_ms (int): チャンネルページを表示してから既読になるまでのミリ秒
+        bulk_ack_enabled (bool): 一括既読（/read-states/ack-bulk）を受け付けるかどうか
+        max_bulk_ack (int): 一括既読で受け付けるチャンネル数の上限（超えた場合は400）
+        heartbeat_interval_ms (int): ゲートウェイのHELLOで通知するハートビート間隔（ミリ秒）
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, rate_limit_probability=0.0, retry_after=0.05, messages_per_channel=200, auto_read_ms=300,
+                 bulk_ack_enabled=True, max_bulk_ack=100, heartbeat_interval_ms=41250):
+        super().__init__(('127.0.0.1', port), FakeDiscordHandler)
+        self.bulk_ack_enabled = bulk_ack_enabled
+        self.max_bulk_ack = max_bulk_ack
+        self.heartbeat_interval_ms = heartbeat_interval_ms
+        self.latency = latency
+        self.auto_read_ms = auto_read_ms
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after = retry_after
+        self.state = FakeDiscordState(messages_per_channel)
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @property
+    def api_base_url(self):
+        return f"{self.base_url}{API_PREFIX}"
+
+    @property
+    def gateway_url(self):
+        return f"ws://127.0.0.1:{self.server_address[1]}/gateway"
+
+    def disconnect_gateways(self):
+        """接続中のゲートウェイをすべて切断する（再接続の確認用）"""
+        with self.state.lock:
+            gateways = list(self.state.gateways)
+        for gateway in gateways:
+            gateway.disconnect()
+        return len(gateways)
+
+    def start(self):
+        """別スレッドで待ち受けを開始する"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description='ローカルのDiscord代替サーバー')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='各リクエストに加える遅延（秒）')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='429を返す確率（0〜1）')
+    parser.add_argument('--retry-after', type=float, default=0.05, help='429で返す再試行までの秒数')
+    parser.add_argument('--messages', type=int, default=200, help='チャンネルごとのメッセージ数')
+    parser.add_argument('--no-bulk-ack', action='store_true', help='一括既読を404で拒否する（1件ずつのackへのフォールバックの確認用）')
+    args = parser.parse_args()
+
+    server = FakeDiscordServer(args.port, args.latency, args.rate_limit, args.retry_after, args.messages,
+                               bulk_ack_enabled=not args.no_bulk_ack)
+    print(f"代替サーバーを起動しました: {server.base_url}")
+    print(f"  DISCORD_API_BASE={server.api_base_url}")
+    print(f"  DISCORD_WEB_BASE={server.base_url}")
+    print(f"  DISCORD_GATEWAY_URL={server.gateway_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import logging
+import os
+import queue
+import threading
+import time
+from selenium_manager import DiscordSeleniumManager
+from read_strategy import ChannelReader
+from driver_watchdog import DriverWatchdog
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# 1回の一括処理でワーカーごとに許可するブラウザ再起動の回数
+DEFAULT_MAX_RESTARTS = 3
+
+class BrowserPool:
+    """
+    複数のブラウザ（ワーカー）で並行してチャンネルを既読にするクラス
+
+    各ワーカーは自分のDiscordSeleniumManagerを持ち、1回ログインしたセッションを使い回す。
+    共有キューからチャンネルを取り出して処理し、ブラウザが応答しなくなった場合は
+    そのワーカーのブラウザだけを再起動して処理を続ける。
+    """
+
+    def __init__(self, config, read_state=None, workers=None):
+        """
+        コンストラクタ
+
+        Args:
+            config (dict): 設定情報
+            read_state (ReadStateStore): チャンネルごとの既読位置
+            workers (int): ワーカー数
+        """
+        self.config = config
+        self.read_state = read_state
+        self.size = workers or config.get('browser_workers') or 1
+        self.max_restarts = config.get('max_browser_restarts', DEFAULT_MAX_RESTARTS)
+        self.readers = []
+        for index in range(self.size):
+            worker_config = dict(config)
+            # プロファイルディレクトリは同時に複数のブラウザで使えないためワーカーごとに分ける
+            if config.get('browser_profile_dir'):
+                worker_config['browser_profile_dir'] = os.path.join(config['browser_profile_dir'], f"worker-{index}")
+            manager = DiscordSeleniumManager(worker_config)
+            self.readers.append(ChannelReader(worker_config, manager, read_state, DriverWatchdog(manager, worker_config)))
+
+    def login_all(self):
+        """
+        全ワーカーのブラウザを並行して起動・ログインする
+
+        Returns:
+            int: ログインに成功したワーカー数
+        """
+        results = [False] * self.size
+
+        def login(index):
+            results[index] = self.readers[index].selenium_manager.login()
+
+        threads = [threading.Thread(target=login, args=(index,), daemon=True) for index in range(self.size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        logged_in = sum(results)
+        logger.info(f"ブラウザワーカー {logged_in}/{self.size} 件がログインしました")
+        return logged_in
+
+    def _worker(self, index, tasks, results):
+        reader = self.readers[index]
+        manager = reader.selenium_manager
+        restarts = 0
+
+        while True:
+            try:
+                position, channel = tasks.get_nowait()
+            except queue.Empty:
+                return
+
+            result = reader.mark_as_read(channel['server_id'], channel['channel_id'], channel.get('last_message_id'))
+
+            # ブラウザが応答しない場合は再起動して1回だけ再試行する
+            if not result['success'] and result['strategy'] == 'selenium' and not manager.is_alive():
+                if restarts >= self.max_restarts:
+                    logger.error(f"ワーカー {index} の再起動回数が上限に達したため停止します")
+                    results[position] = result
+                    return
+                restarts += 1
+                logger.warning(f"ワーカー {index} のブラウザを再起動します（{restarts}/{self.max_restarts}）")
+                if manager.restart():
+                    result = reader.mark_as_read(channel['server_id'], channel['channel_id'], channel.get('last_message_id'))
+
+            result['worker'] = index
+            results[position] = result
+            logger.info(f"[ワーカー {index}] チャンネル {channel['channel_id']}: {'成功' if result['success'] else '失敗'}（{result['strategy']}） ({result['elapsed']:.2f}秒)")
+
+    def run(self, channels):
+        """
+        チャンネルを全ワーカーで分担して既読にする
+
+        Args:
+            channels (list): server_idとchannel_idを持つ辞書のリスト
+
+        Returns:
+            list: チャンネルごとの結果（入力と同じ順序）
+        """
+        batch_start = time.time()
+        for reader in self.readers:
+            reader.start_sweep()
+        tasks = queue.Queue()
+        for position, channel in enumerate(channels):
+            tasks.put((position, channel))
+        results = [None] * len(channels)
+
+        threads = [
+            threading.Thread(target=self._worker, args=(index, tasks, results), daemon=True)
+            for index in range(min(self.size, len(channels)))
+        ]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            # 各ワーカーが記録した既読位置を1回だけ保存する
+            if self.read_state is not None:
+                self.read_state.save()
+
+        # 全ワーカーが停止して処理されなかったチャンネルは失敗として扱う
+        for position, channel in enumerate(channels):
+            if results[position] is None:
+                results[position] = {
+                    'server_id': channel['server_id'],
+                    'channel_id': channel['channel_id'],
+                    'success': False,
+                    'skipped': False,
+                    'strategy': None,
+                    'elapsed': 0.0
+                }
+
+        succeeded = sum(1 for result in results if result['success'])
+        skipped_count = sum(1 for result in results if result['skipped'])
+        logger.info(f"一括処理が完了しました（ワーカー {len(threads)}件）: 成功 {succeeded}件（うちスキップ {skipped_count}件） / 失敗 {len(results) - succeeded}件 / 合計 {time.time() - batch_start:.2f}秒")
+        for reader in self.readers:
+            reader.log_stats()
+        return results
+
+    def close(self):
+        """全ワーカーのブラウザを閉じる"""
+        for reader in self.readers:
+            reader.selenium_manager.close()
@@ -21,6 +21,47 @@ except ImportError:
 # ロギング設定
 logger = logging.getLogger(__name__)
 
+def parse_channel_entry(entry, default_server_id=None):
+    """
+    チャンネル指定文字列を解析する
+
+    "サーバーID:チャンネルID"、"サーバーID,チャンネルID"、"サーバーID チャンネルID"
+    またはチャンネルIDのみの形式を受け付ける。サーバーIDに続けて
+    更新間隔（秒）と優先度（小さいほど優先）を指定できる
+
+    Args:
+        entry (str): チャンネル指定文字列
+        default_server_id (str): サーバーIDが省略された場合に使用するサーバーID
+
+    Returns:
+        dict: server_idとchannel_id（指定があればintervalとpriority）を持つ辞書
+    """
+    parts = [p for p in entry.replace(':', ' ').replace(',', ' ').split() if p]
+    if len(parts) == 1:
+        return {'server_id': default_server_id or '@me', 'channel_id': parts[0]}
+    if 2 <= len(parts) <= 4:
+        channel = {'server_id': parts[0], 'channel_id': parts[1]}
+        try:
+            if len(parts) >= 3:
+                channel['interval'] = int(parts[2])
+            if len(parts) == 4:
+                channel['priority'] = int(parts[3])
+        except ValueError:
+            raise ValueError(f"チャンネル指定の形式が正しくありません: {entry}")
+        return channel
+    raise ValueError(f"チャンネル指定の形式が正しくありません: {entry}")
+
+def load_channels_file(path, default_server_id=None):
+    """チャンネル一覧ファイルを読み込む（1行に1チャンネル、#以降はコメント）"""
+    channels = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            channels.append(parse_channel_entry(line, default_server_id))
+    return channels
+
 def load_config():
     """環境変数とコマンドライン引数から設定を読み込む"""
     load_dotenv()
@@ -29,8 +70,17 @@ def load_config():
     parser = argparse.ArgumentParser(description='Discordチャンネル既読処理')
     parser.add_argument('--server-id', help='DiscordサーバーID')
     parser.add_argument('--channel-id', help='DiscordチャンネルID')
+    parser.add_argument('--channels', help='複数チャンネルの指定（"サーバーID:チャンネルID" をカンマ区切り）')
+    parser.add_argument('--channels-file', help='チャンネル一覧ファイルのパス（1行に "サーバーID チャンネルID"）')
     parser.add_argument('--limit', type=int, default=50, help='取得するメッセージ数')
     parser.add_argument('--interval', type=int, help='更新間隔（秒）')
+    parser.add_argument('--mode', choices=['hybrid', 'rest', 'selenium', 'async', 'gateway'], help='処理モード（hybrid: API優先でブラウザにフォールバック, rest: APIのみ, selenium: ブラウザ自動化, async: APIを並行呼び出し, gateway: イベント駆動）')
+    parser.add_argument('--concurrency', type=int, help='asyncモードで同時に実行するリクエスト数')
+    parser.add_argument('--browser-workers', type=int, help='並行して動かすブラウザワーカーの数')
+    parser.add_argument('--guild-scan', action='store_true', help='サーバーのチャンネル一覧で未読を判定し、未読のチャンネルだけを既読にする')
+    parser.add_argument('--bulk-ack', action='store_true', help='APIによる既読をまとめて送信する（hybrid・restモード）')
+    parser.add_argument('--metrics-port', type=int, help='メトリクスを公開するローカルのポート（Prometheus形式）')
+    parser.add_argument('--trace', help='実行のタイムラインを書き出すトレースファイルのパス（Chromeトレース形式）')
     parser.add_argument('--email', help='Discordアカウントのメールアドレス')
     parser.add_argument('--password', help='Discordアカウントのパスワード')
     
@@ -43,14 +93,89 @@ def load_config():
         'limit': args.limit or int(os.getenv('MESSAGE_LIMIT', 50)),
         'update_interval': args.interval or int(os.getenv('UPDATE_INTERVAL', 0)),
         'email': args.email or os.getenv('DISCORD_EMAIL'),
-        'password': args.password or os.getenv('DISCORD_PASSWORD')
+        'password': args.password or os.getenv('DISCORD_PASSWORD'),
+        'mode': (args.mode or os.getenv('MODE', 'hybrid')).lower(),
+        'concurrency': args.concurrency or int(os.getenv('CONCURRENCY', 10)),
+        'skip_unchanged': os.getenv('SKIP_UNCHANGED', 'true').lower() == 'true',
+        'guild_scan': args.guild_scan or os.getenv('GUILD_SCAN', 'false').lower() == 'true',
+        'bulk_ack': args.bulk_ack or os.getenv('BULK_ACK', 'false').lower() == 'true',
+        'bulk_ack_batch_size': int(os.getenv('BULK_ACK_BATCH_SIZE', 100)),
+        'bulk_ack_flush_interval': float(os.getenv('BULK_ACK_FLUSH_INTERVAL', 1.0)),
+        'read_state_file': os.getenv('READ_STATE_FILE'),
+        'page_ready_timeout': float(os.getenv('PAGE_READY_TIMEOUT', 10)),
+        'read_state_timeout': float(os.getenv('READ_STATE_TIMEOUT', 3)),
+        'click_settle_timeout': float(os.getenv('CLICK_SETTLE_TIMEOUT', 2)),
+        'browser_profile_dir': os.getenv('BROWSER_PROFILE_DIR'),
+        'browser_workers': max(1, args.browser_workers or int(os.getenv('BROWSER_WORKERS', 1))),
+        'driver_path': os.getenv('WEBDRIVER_PATH'),
+        'driver_offline': os.getenv('WEBDRIVER_OFFLINE', 'false').lower() == 'true',
+        'browser_version': os.getenv('BROWSER_VERSION'),
+        'browser': os.getenv('BROWSER', 'chrome'),
+        'headless': os.getenv('HEADLESS', 'true'),
+        'lean_browser': os.getenv('LEAN_BROWSER', 'false').lower() == 'true',
+        'lean_memory_mb': int(os.getenv('LEAN_MEMORY_MB', 512)),
+        'lean_cache_mb': int(os.getenv('LEAN_CACHE_MB', 32)),
+        'watchdog_max_rss_mb': float(os.getenv('WATCHDOG_MAX_RSS_MB', 1500)),
+        'watchdog_max_failures': int(os.getenv('WATCHDOG_MAX_FAILURES', 3)),
+        'watchdog_max_pages': int(os.getenv('WATCHDOG_MAX_PAGES', 500)),
+        'watchdog_rss_sample_pages': int(os.getenv('WATCHDOG_RSS_SAMPLE_PAGES', 10)),
+        'watchdog_rss_sample_seconds': float(os.getenv('WATCHDOG_RSS_SAMPLE_SECONDS', 10)),
+        'schedule_jitter': float(os.getenv('SCHEDULE_JITTER', 0.1)),
+        'schedule_backoff': float(os.getenv('SCHEDULE_BACKOFF', 1.5)),
+        'schedule_max_interval': os.getenv('SCHEDULE_MAX_INTERVAL'),
+        'gateway_debounce': float(os.getenv('GATEWAY_DEBOUNCE', 2)),
+        'gateway_save_interval': float(os.getenv('GATEWAY_SAVE_INTERVAL', 30)),
+        'compact_fields': [field.strip() for field in os.getenv('COMPACT_FIELDS', '').split(',') if field.strip()],
+        'metrics_port': args.metrics_port or int(os.getenv('METRICS_PORT', 0)),
+        'metrics_file': os.getenv('METRICS_FILE'),
+        'metrics_interval': float(os.getenv('METRICS_INTERVAL', 60)),
+        'trace_file': args.trace or os.getenv('TRACE_FILE')
     }
     
+    if config['mode'] not in ('hybrid', 'rest', 'selenium', 'async', 'gateway'):
+        raise ValueError(f"サポートされていない処理モード: {config['mode']}")
+    
+    # 処理対象チャンネルの一覧を作成
+    channels = []
+    channels_arg = args.channels or os.getenv('DISCORD_CHANNELS')
+    if channels_arg:
+        # カンマ区切りで "サーバーID:チャンネルID" を列挙する
+        for entry in channels_arg.split(','):
+            if entry.strip():
+                channels.append(parse_channel_entry(entry.strip(), config['server_id']))
+    
+    channels_file = args.channels_file or os.getenv('DISCORD_CHANNELS_FILE')
+    if channels_file:
+        try:
+            channels.extend(load_channels_file(channels_file, config['server_id']))
+        except OSError as e:
+            logger.error(f"チャンネル一覧ファイルを読み込めませんでした: {e}")
+            raise ValueError(f"チャンネル一覧ファイルを読み込めませんでした: {channels_file}")
+    
+    if config['channel_id']:
+        channels.insert(0, {'server_id': config['server_id'] or '@me', 'channel_id': config['channel_id']})
+    
+    # チャンネル一覧で更新間隔を指定した場合は、--intervalがなくても定期実行にする
+    if not config['update_interval']:
+        config['update_interval'] = min((channel['interval'] for channel in channels if channel.get('interval')), default=0)
+    
+    # 重複を除外（指定順は維持）
+    seen = set()
+    config['channels'] = []
+    for channel in channels:
+        key = (channel['server_id'], channel['channel_id'])
+        if key not in seen:
+            seen.add(key)
+            config['channels'].append(channel)
+    
     # 必須設定の検証
-    if not config['channel_id']:
+    if not config['channels']:
         logger.error("チャンネルIDが必要ですが、提供されていません")
         raise ValueError("チャンネルIDが必要です")
     
+    if not config['channel_id']:
+        config['channel_id'] = config['channels'][0]['channel_id']
+    
     # メールアドレスとパスワードの検証と入力要求
     if not config['email']:
         config['email'] = input("Discordのメールアドレスを入力してください: ")
@@ -58,5 +183,5 @@ def load_config():
     if not config['password']:
         config['password'] = getpass.getpass("Discordのパスワードを入力してください: ")
     
-    logger.info(f"設定を読み込みました: server_id={config['server_id']}, channel_id={config['channel_id']}, update_interval={config['update_interval']}秒")
+    logger.info(f"設定を読み込みました: server_id={config['server_id']}, channel_id={config['channel_id']}, channels={len(config['channels'])}件, update_interval={config['update_interval']}秒")
     return config
@@ -0,0 +1,103 @@
+import json
+import os
+import logging
+import re
+import shutil
+import subprocess
+import time
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# 解決済みWebDriverのパスを保存するファイル
+DRIVER_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.driver_cache')
+
+# キャッシュの有効期限（ブラウザのバージョンが分からない場合の更新間隔を兼ねる）
+DEFAULT_DRIVER_CACHE_TTL = 7 * 24 * 60 * 60
+
+# ブラウザのバージョン確認に使う実行ファイル名
+BROWSER_BINARIES = {
+    'chrome': ['google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser'],
+    'firefox': ['firefox'],
+    'edge': ['microsoft-edge', 'microsoft-edge-stable']
+}
+
+def detect_browser_version(browser_name):
+    """
+    インストールされているブラウザのバージョンを取得する
+
+    Returns:
+        str: バージョン文字列（取得できない場合は"unknown"）
+    """
+    for binary in BROWSER_BINARIES.get(browser_name, []):
+        path = shutil.which(binary)
+        if not path:
+            continue
+        try:
+            output = subprocess.run([path, '--version'], capture_output=True, text=True, timeout=5).stdout
+        except Exception:
+            continue
+        match = re.search(r'(\d+(?:\.\d+)+)', output)
+        if match:
+            return match.group(1)
+    return 'unknown'
+
+def _load_cache():
+    try:
+        if os.path.exists(DRIVER_CACHE_FILE):
+            with open(DRIVER_CACHE_FILE, 'r') as f:
+                return json.load(f)
+    except Exception as e:
+        logger.warning(f"WebDriverキャッシュを読み込めませんでした: {e}")
+    return {}
+
+def _save_cache(cache):
+    try:
+        with open(DRIVER_CACHE_FILE, 'w') as f:
+            json.dump(cache, f)
+    except Exception as e:
+        logger.warning(f"WebDriverキャッシュを保存できませんでした: {e}")
+
+def resolve_driver_path(browser_name, install, config):
+    """
+    WebDriverの実行ファイルのパスを解決する
+
+    優先順位: 設定で固定したパス > キャッシュ（ブラウザとバージョンが一致し期限内のもの） > installの実行。
+    オフラインモードではinstallを呼ばず、ネットワークにアクセスしない。
+
+    Args:
+        browser_name (str): ブラウザ名
+        install (callable): WebDriverをダウンロードしてパスを返す関数（webdriver_managerのinstall）
+        config (dict): 設定情報
+
+    Returns:
+        str: WebDriverの実行ファイルのパス
+    """
+    pinned_path = config.get('driver_path')
+    if pinned_path:
+        if not os.path.exists(pinned_path):
+            raise FileNotFoundError(f"指定されたWebDriverが見つかりません: {pinned_path}")
+        logger.info(f"指定されたWebDriverを使用します: {pinned_path}")
+        return pinned_path
+
+    offline = config.get('driver_offline', False)
+    version = config.get('browser_version') or detect_browser_version(browser_name)
+    key = f"{browser_name}:{version}"
+    ttl = config.get('driver_cache_ttl', DEFAULT_DRIVER_CACHE_TTL)
+
+    cache = _load_cache()
+    entry = cache.get(key)
+    if entry and os.path.exists(entry.get('path', '')):
+        # オフラインモードでは期限切れでもキャッシュを使う
+        if offline or time.time() - entry.get('timestamp', 0) < ttl:
+            logger.info(f"キャッシュされたWebDriverを使用します: {entry['path']}")
+            return entry['path']
+
+    if offline:
+        raise FileNotFoundError(f"オフラインモードですが、{key} のWebDriverが設定にもキャッシュにもありません")
+
+    logger.info(f"WebDriverを解決しています: {key}")
+    path = install()
+    cache[key] = {'path': path, 'timestamp': time.time()}
+    _save_cache(cache)
+    return path
@@ -0,0 +1,193 @@
+import os
+import logging
+import time
+import metrics
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# ブラウザを再起動するしきい値（デフォルト）
+DEFAULT_MAX_RSS_MB = 1500
+DEFAULT_MAX_CONSECUTIVE_FAILURES = 3
+DEFAULT_MAX_PAGES = 500
+# RSSを計測する間隔（プロセスツリーの走査は重いため、ページ数か経過秒数のどちらかに達したときだけ行う）
+DEFAULT_RSS_SAMPLE_PAGES = 10
+DEFAULT_RSS_SAMPLE_SECONDS = 10.0
+
+def _proc_children(pid):
+    """/procから子プロセスのPIDを取得する（Linuxのみ）"""
+    children = []
+    task_dir = f"/proc/{pid}/task"
+    try:
+        for tid in os.listdir(task_dir):
+            with open(f"{task_dir}/{tid}/children", 'r') as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return children
+
+def _proc_rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return 0
+
+def process_tree_rss_mb(pid):
+    """
+    指定したプロセスとその子孫プロセスのRSS合計を返す
+
+    Returns:
+        float: RSS合計（MB）。取得できない場合はNone
+    """
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            processes = [root] + root.children(recursive=True)
+            total = 0
+            for process in processes:
+                try:
+                    total += process.memory_info().rss
+                except psutil.Error:
+                    continue
+            return total / (1024 * 1024)
+        except psutil.Error:
+            return None
+
+    if not os.path.exists(f"/proc/{pid}"):
+        return None
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        total += _proc_rss_bytes(current)
+        pending.extend(_proc_children(current))
+    return total / (1024 * 1024)
+
+class DriverWatchdog:
+    """
+    ブラウザの状態を監視し、劣化したら再起動するクラス
+
+    ブラウザのプロセスツリーのRSS、連続失敗回数、起動後に開いたページ数を記録し、
+    いずれかがしきい値を超えたらブラウザを終了・再起動・再ログインする。
+    """
+
+    def __init__(self, selenium_manager, config):
+        """
+        コンストラクタ
+
+        Args:
+            selenium_manager (DiscordSeleniumManager): 監視対象のSeleniumマネージャー
+            config (dict): 設定情報
+        """
+        self.selenium_manager = selenium_manager
+        self.max_rss_mb = float(config.get('watchdog_max_rss_mb', DEFAULT_MAX_RSS_MB))
+        self.max_consecutive_failures = int(config.get('watchdog_max_failures', DEFAULT_MAX_CONSECUTIVE_FAILURES))
+        self.max_pages = int(config.get('watchdog_max_pages', DEFAULT_MAX_PAGES))
+        self.rss_sample_pages = int(config.get('watchdog_rss_sample_pages', DEFAULT_RSS_SAMPLE_PAGES))
+        self.rss_sample_seconds = float(config.get('watchdog_rss_sample_seconds', DEFAULT_RSS_SAMPLE_SECONDS))
+        self.page_count = 0
+        self.consecutive_failures = 0
+        self.started_at = time.time()
+        self._reset_rss_sample()
+        self.recycle_count = 0
+
+    def browser_rss_mb(self):
+        """ブラウザ（WebDriverプロセスとその子孫）のRSS合計を返す"""
+        driver = self.selenium_manager.driver
+        try:
+            pid = driver.service.process.pid
+        except AttributeError:
+            return None
+        return process_tree_rss_mb(pid)
+
+    def _reset_rss_sample(self):
+        self.last_rss_mb = None
+        self._rss_sampled_pages = 0
+        self._rss_sampled_at = time.monotonic()
+
+    def _sample_rss_mb(self):
+        """前回の計測から一定のページ数か秒数が経過していればRSSを計測し、最新の計測値を返す"""
+        if (self.page_count - self._rss_sampled_pages >= self.rss_sample_pages
+                or time.monotonic() - self._rss_sampled_at >= self.rss_sample_seconds):
+            self.last_rss_mb = self.browser_rss_mb()
+            self._rss_sampled_pages = self.page_count
+            self._rss_sampled_at = time.monotonic()
+        return self.last_rss_mb
+
+    def record(self, success):
+        """ブラウザで1チャンネルを処理した結果を記録する"""
+        self.page_count += 1
+        self.consecutive_failures = 0 if success else self.consecutive_failures + 1
+
+    def check(self):
+        """
+        再起動が必要かどうかを判定する
+
+        カウンタだけで判定できる条件を先に確認し、RSSは一定間隔で計測した値を使う。
+
+        Returns:
+            tuple: (再起動の理由（failures, pages, unresponsive, memoryのいずれか。不要ならNone）, RSS（MB、最後に計測した値）)
+        """
+        if self.selenium_manager.driver is None:
+            return None, None
+        if self.consecutive_failures >= self.max_consecutive_failures:
+            return 'failures', self.last_rss_mb
+        if self.page_count >= self.max_pages:
+            return 'pages', self.last_rss_mb
+        if not self.selenium_manager.is_alive():
+            return 'unresponsive', self.last_rss_mb
+        rss_mb = self._sample_rss_mb()
+        if rss_mb is not None and rss_mb >= self.max_rss_mb:
+            return 'memory', rss_mb
+        return None, rss_mb
+
+    def _describe(self, reason, rss_mb):
+        """再起動の理由をログ用の文言にする"""
+        if reason == 'failures':
+            return f"連続失敗 {self.consecutive_failures}回"
+        if reason == 'unresponsive':
+            return "ブラウザが応答しません"
+        if reason == 'memory':
+            return f"メモリ使用量 {rss_mb:.0f}MB"
+        return f"ページ数 {self.page_count}"
+
+    def maybe_recycle(self):
+        """
+        しきい値を超えていればブラウザを再起動する
+
+        Returns:
+            bool: 再起動したかどうか
+        """
+        reason, rss_mb = self.check()
+        if reason is None:
+            return False
+
+        description = self._describe(reason, rss_mb)
+        logger.warning(f"ブラウザを再起動します（理由: {description}）")
+        start_time = time.time()
+        success = self.selenium_manager.restart()
+        elapsed = time.time() - start_time
+        self.recycle_count += 1
+        metrics.inc('browser_recycles_total', reason=reason, success=success)
+        metrics.observe('browser_recycle_seconds', elapsed, reason=reason)
+        rss_text = f"{rss_mb:.0f}MB" if rss_mb is not None else "不明"
+        logger.info(
+            f"ブラウザ再起動 #{self.recycle_count}: {'成功' if success else '失敗'} "
+            f"(理由: {description}, RSS: {rss_text}, ページ数: {self.page_count}, "
+            f"稼働時間: {start_time - self.started_at:.0f}秒, 所要時間: {elapsed:.2f}秒)"
+        )
+
+        self.page_count = 0
+        self.consecutive_failures = 0
+        self.started_at = time.time()
+        self._reset_rss_sample()
+        return True
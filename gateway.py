@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import os
+import aiohttp
+import json_codec
+from async_client import AsyncDiscordClient, mark_channels_as_read
+from auth import get_token
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# DiscordゲートウェイのURL（ローカルの検証用サーバーに向ける場合は環境変数で上書きする）
+GATEWAY_URL = os.getenv('DISCORD_GATEWAY_URL', 'wss://gateway.discord.gg/?v=9&encoding=json')
+
+# ゲートウェイのオペコード
+OP_DISPATCH = 0
+OP_HEARTBEAT = 1
+OP_IDENTIFY = 2
+OP_RECONNECT = 7
+OP_INVALID_SESSION = 9
+OP_HELLO = 10
+OP_HEARTBEAT_ACK = 11
+
+# 同じチャンネルへの連続したメッセージをまとめる秒数
+DEFAULT_DEBOUNCE = 2.0
+# 既読位置をファイルへ保存する間隔（秒）
+DEFAULT_SAVE_INTERVAL = 30.0
+# 再接続の待機秒数の上限
+MAX_RECONNECT_DELAY = 60.0
+
+class GatewayReader:
+    """
+    ゲートウェイのイベントを受信して、新着のあったチャンネルだけを既読にするクラス
+
+    MESSAGE_CREATEを受け取ったチャンネルを一定時間まとめ（デバウンス）、
+    最後に受け取ったメッセージまでを1回のackで既読にする。
+    """
+
+    def __init__(self, config, channels, read_state=None):
+        """
+        コンストラクタ
+
+        Args:
+            config (dict): 設定情報
+            channels (list): server_idとchannel_idを持つ辞書のリスト（対象チャンネル）
+            read_state (ReadStateStore): チャンネルごとの既読位置
+        """
+        self.config = config
+        self.channels = channels
+        self.channel_ids = {channel['channel_id'] for channel in channels}
+        self.read_state = read_state
+        self.debounce = float(config.get('gateway_debounce', DEFAULT_DEBOUNCE))
+        self.save_interval = float(config.get('gateway_save_interval', DEFAULT_SAVE_INTERVAL))
+        self.gateway_url = config.get('gateway_url') or GATEWAY_URL
+        self.sequence = None
+        self._pending = {}
+        self._timers = {}
+        self._client = None
+        self._catch_up_task = None
+        self._ready_count = 0
+        self.stats = {'events': 0, 'acks': 0, 'failed': 0, 'catch_ups': 0}
+
+    def _on_message_create(self, data):
+        channel_id = data.get('channel_id')
+        if channel_id not in self.channel_ids:
+            return
+        self.stats['events'] += 1
+        self._pending[channel_id] = data['id']
+        if channel_id not in self._timers:
+            self._timers[channel_id] = asyncio.create_task(self._flush_later(channel_id))
+
+    async def _flush_later(self, channel_id):
+        """デバウンス時間の経過後に、そのチャンネルの最新メッセージまで既読にする"""
+        try:
+            await asyncio.sleep(self.debounce)
+        finally:
+            self._timers.pop(channel_id, None)
+        message_id = self._pending.pop(channel_id, None)
+        if message_id is None:
+            return
+        try:
+            await self._client.mark_channel_as_read(channel_id, message_id)
+            self.stats['acks'] += 1
+            if self.read_state is not None:
+                self.read_state.set(channel_id, message_id, save=False)
+        except Exception as e:
+            self.stats['failed'] += 1
+            logger.error(f"チャンネル {channel_id} の既読処理に失敗しました: {e}")
+
+    async def _catch_up(self):
+        """切断中に届いたメッセージを取りこぼさないよう、全チャンネルを既読にし直す"""
+        try:
+            results = await mark_channels_as_read(self.config, self.channels, self.config.get('concurrency'), self.read_state)
+            self.stats['catch_ups'] += 1
+            failed = sum(1 for result in results if not result['success'])
+            logger.info(f"再接続後の既読処理が完了しました（失敗: {failed}件）")
+        except Exception as e:
+            logger.error(f"再接続後の既読処理に失敗しました: {e}")
+
+    def _on_ready(self):
+        self._ready_count += 1
+        logger.info(f"ゲートウェイに接続しました（監視チャンネル: {len(self.channel_ids)}件）")
+        if self._ready_count == 1:
+            return
+        # RESUMEは行わないため、切断中のMESSAGE_CREATEは一括の既読処理で補う
+        if self._catch_up_task is not None and not self._catch_up_task.done():
+            self._catch_up_task.cancel()
+        self._catch_up_task = asyncio.create_task(self._catch_up())
+
+    async def _save_periodically(self):
+        """記録した既読位置を一定間隔でファイルへ保存する（変更がなければ書き込まない）"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.save_interval)
+            await loop.run_in_executor(None, self.read_state.save)
+
+    async def _heartbeat(self, ws, interval):
+        while True:
+            await asyncio.sleep(interval)
+            await ws.send_json({'op': OP_HEARTBEAT, 'd': self.sequence})
+
+    async def _identify(self, ws):
+        loop = asyncio.get_running_loop()
+        token = await loop.run_in_executor(None, get_token, self.config)
+        await ws.send_json({
+            'op': OP_IDENTIFY,
+            'd': {
+                'token': token,
+                'properties': {'os': 'Windows', 'browser': 'Chrome', 'device': ''}
+            }
+        })
+
+    async def _run_session(self, session):
+        """
+        ゲートウェイに1回接続してイベントを処理する
+
+        Returns:
+            bool: 正常に接続できていたかどうか（再接続の待機時間の判定に使う）
+        """
+        heartbeat_task = None
+        connected = False
+        try:
+            async with session.ws_connect(self.gateway_url) as ws:
+                async for msg in ws:
+                    if msg.type != aiohttp.WSMsgType.TEXT:
+                        if msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+                        continue
+
+                    payload = json_codec.loads(msg.data)
+                    op = payload.get('op')
+                    if payload.get('s') is not None:
+                        self.sequence = payload['s']
+
+                    if op == OP_HELLO:
+                        interval = payload['d']['heartbeat_interval'] / 1000
+                        heartbeat_task = asyncio.create_task(self._heartbeat(ws, interval))
+                        await self._identify(ws)
+                    elif op == OP_DISPATCH:
+                        if payload.get('t') == 'READY':
+                            connected = True
+                            self._on_ready()
+                        elif payload.get('t') == 'MESSAGE_CREATE':
+                            self._on_message_create(payload['d'])
+                    elif op == OP_HEARTBEAT:
+                        await ws.send_json({'op': OP_HEARTBEAT, 'd': self.sequence})
+                    elif op in (OP_RECONNECT, OP_INVALID_SESSION):
+                        logger.info("ゲートウェイから再接続を要求されました")
+                        break
+        finally:
+            if heartbeat_task:
+                heartbeat_task.cancel()
+        return connected
+
+    async def run(self):
+        """ゲートウェイに接続し、切断された場合は再接続しながらイベントを処理し続ける"""
+        async with AsyncDiscordClient(self.config) as client:
+            self._client = client
+            delay = 1.0
+            save_task = asyncio.create_task(self._save_periodically()) if self.read_state is not None else None
+            try:
+                async with aiohttp.ClientSession() as session:
+                    while True:
+                        try:
+                            if await self._run_session(session):
+                                delay = 1.0
+                        except asyncio.CancelledError:
+                            raise
+                        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                            logger.warning(f"ゲートウェイとの接続でエラーが発生しました: {e}")
+                        except Exception as e:
+                            # トークンの取得失敗（ログインの失敗やrequestsの例外）も待機してから再接続する
+                            logger.warning(f"ゲートウェイへの接続中にエラーが発生しました: {e}")
+                        logger.info(f"{delay:.0f}秒後にゲートウェイへ再接続します")
+                        await asyncio.sleep(delay)
+                        delay = min(delay * 2, MAX_RECONNECT_DELAY)
+            finally:
+                if save_task is not None:
+                    save_task.cancel()
+                    self.read_state.save()
+
+async def run_gateway(config, read_state=None):
+    """
+    起動時に未読を一括で既読にしてから、ゲートウェイのイベントで新着のみを既読にし続ける
+
+    Args:
+        config (dict): 設定情報
+        read_state (ReadStateStore): チャンネルごとの既読位置
+    """
+    channels = config['channels']
+    await mark_channels_as_read(config, channels, config.get('concurrency'), read_state)
+    await GatewayReader(config, channels, read_state).run()
@@ -0,0 +1,89 @@
+import logging
+import time
+import metrics
+from scraper import list_guild_channels
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+class GuildScanner:
+    """
+    サーバーのチャンネル一覧から未読のチャンネルを判定するクラス
+
+    チャンネルごとに最新メッセージを取得する代わりに、サーバーごとに1回チャンネル一覧を取得し、
+    各チャンネルのlast_message_idをReadStateStoreの既読位置と比較する。
+    一覧を取得できなかったサーバーや一覧にないチャンネル（DMやスレッドなど）は、
+    従来どおりチャンネルごとに判定させるためそのまま既読処理に回す。
+    """
+
+    def __init__(self, config, read_state):
+        """
+        コンストラクタ
+
+        Args:
+            config (dict): 設定情報
+            read_state (ReadStateStore): チャンネルごとの既読位置
+        """
+        self.config = config
+        self.read_state = read_state
+
+    def _latest_message_ids(self, guild_id):
+        """
+        サーバー内のチャンネルごとの最新メッセージIDを取得する
+
+        Returns:
+            dict: チャンネルIDと最新メッセージIDの辞書（取得に失敗した場合はNone）
+        """
+        try:
+            channels = list_guild_channels(guild_id, self.config)
+        except Exception as e:
+            logger.warning(f"サーバー {guild_id} のチャンネル一覧を取得できませんでした。チャンネルごとに確認します: {e}")
+            return None
+        return {str(channel['id']): channel.get('last_message_id') for channel in channels}
+
+    def _is_unread(self, channel_id, latest_message_id):
+        last_read = self.read_state.get(channel_id)
+        return last_read is None or int(latest_message_id) > int(last_read)
+
+    def split_unread(self, channels):
+        """
+        チャンネルを未読のものとそれ以外に分ける
+
+        未読のチャンネルにはlast_message_idを付与する（既読処理で最新メッセージを取得し直さないため）。
+
+        Args:
+            channels (list): server_idとchannel_idを持つ辞書のリスト
+
+        Returns:
+            tuple: (既読処理が必要なチャンネルのリスト, 未読がないためスキップしたチャンネルの結果のリスト)
+        """
+        start_time = time.time()
+        guild_ids = {channel['server_id'] for channel in channels if channel['server_id'] != '@me'}
+        latest_by_guild = {guild_id: self._latest_message_ids(guild_id) for guild_id in sorted(guild_ids)}
+
+        pending = []
+        skipped = []
+        for channel in channels:
+            latest_ids = latest_by_guild.get(channel['server_id'])
+            if latest_ids is None or channel['channel_id'] not in latest_ids:
+                metrics.inc('guild_scan_channels_total', result='unknown')
+                pending.append(channel)
+                continue
+
+            latest_message_id = latest_ids[channel['channel_id']]
+            if latest_message_id and self._is_unread(channel['channel_id'], latest_message_id):
+                metrics.inc('guild_scan_channels_total', result='unread')
+                pending.append(dict(channel, last_message_id=latest_message_id))
+            else:
+                metrics.inc('guild_scan_channels_total', result='read')
+                skipped.append({
+                    'server_id': channel['server_id'],
+                    'channel_id': channel['channel_id'],
+                    'success': True,
+                    'skipped': True,
+                    'strategy': 'guild_scan',
+                    'elapsed': 0.0
+                })
+
+        logger.info(f"サーバー {len(guild_ids)}件のチャンネル一覧から未読を判定しました: 既読処理 {len(pending)}件 / スキップ {len(skipped)}件 ({time.time() - start_time:.2f}秒)")
+        return pending, skipped
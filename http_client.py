@@ -0,0 +1,149 @@
+import os
+import logging
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+import metrics
+import tracing
+from json_codec import decode_response
+from rate_limiter import get_rate_limiter, retry_after_from, route_key
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# Discord APIのベースURL（ローカルの検証用サーバーに向ける場合は環境変数で上書きする）
+BASE_URL = os.getenv('DISCORD_API_BASE', 'https://discord.com/api/v9').rstrip('/')
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# 全リクエスト共通のヘッダー
+DEFAULT_HEADERS = {
+    "Content-Type": "application/json",
+    "User-Agent": USER_AGENT
+}
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 15.0
+# 429を受け取った際の最大再試行回数
+DEFAULT_MAX_RETRIES = 3
+
+_session = None
+_session_lock = threading.Lock()
+
+def _get_setting(config, key, env_name, default, cast):
+    """設定値を config → 環境変数 → デフォルト値 の順に取得する"""
+    value = None
+    if config:
+        value = config.get(key)
+    if value is None:
+        value = os.getenv(env_name)
+    if value is None or value == '':
+        return default
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        logger.warning(f"{env_name} の値が不正です: {value}。デフォルト値 {default} を使用します")
+        return default
+
+def get_timeout(config=None):
+    """(接続タイムアウト, 読み込みタイムアウト) のタプルを返す"""
+    connect_timeout = _get_setting(config, 'http_connect_timeout', 'HTTP_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT, float)
+    read_timeout = _get_setting(config, 'http_read_timeout', 'HTTP_READ_TIMEOUT', DEFAULT_READ_TIMEOUT, float)
+    return (connect_timeout, read_timeout)
+
+def get_session(config=None):
+    """
+    プロセス全体で共有するHTTPセッションを取得する
+
+    キープアライブ接続をプールし、TCP/TLSハンドシェイクをリクエストごとに行わないようにする。
+    プールサイズは最初にセッションを作成した時点の設定が使われる。
+
+    Args:
+        config (dict): 設定情報
+
+    Returns:
+        requests.Session: 共有セッション
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = _get_setting(config, 'http_pool_size', 'HTTP_POOL_SIZE', DEFAULT_POOL_SIZE, int)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                logger.debug(f"HTTPセッションを作成しました（プールサイズ: {pool_size}）")
+                _session = session
+    return _session
+
+def get_max_retries(config=None):
+    """429を受け取った際の最大再試行回数を返す"""
+    return _get_setting(config, 'http_max_retries', 'HTTP_MAX_RETRIES', DEFAULT_MAX_RETRIES, int)
+
+def request(method, url, config=None, **kwargs):
+    """
+    共有セッションでHTTPリクエストを送信する
+
+    送信前にレート制限の枠を確保し、429を受け取った場合は上限回数まで待機して再試行する。
+    再試行しても429の場合はそのレスポンスを返す。
+
+    Args:
+        method (str): HTTPメソッド
+        url (str): リクエスト先URL（"/"で始まる場合はBASE_URLからの相対パス）
+        config (dict): 設定情報
+        **kwargs: requests.Session.requestに渡す追加引数
+
+    Returns:
+        requests.Response: レスポンス
+    """
+    if url.startswith('/'):
+        path = url
+        url = f"{BASE_URL}{url}"
+    else:
+        path = url[len(BASE_URL):] if url.startswith(BASE_URL) else url
+    kwargs.setdefault('timeout', get_timeout(config))
+    
+    limiter = get_rate_limiter(config)
+    route = route_key(method, path)
+    session = get_session(config)
+    max_retries = get_max_retries(config)
+    label = metrics.route_label(route[0])
+    
+    for attempt in range(max_retries + 1):
+        if attempt:
+            metrics.inc('http_retries_total', route=label, reason='429')
+        limiter.acquire(route)
+        start_time = time.perf_counter()
+        response = session.request(method, url, **kwargs)
+        duration = time.perf_counter() - start_time
+        metrics.observe('http_request_seconds', duration, route=label)
+        metrics.inc('http_requests_total', route=label, status=response.status_code)
+        tracing.record('http.request', start_time, duration, route=label, status=response.status_code, attempt=attempt)
+        limiter.update(route, response.headers)
+        
+        if response.status_code == 429:
+            metrics.inc('http_rate_limited_total', route=label)
+            tracing.instant('http.rate_limited', route=label)
+        if response.status_code != 429 or attempt == max_retries:
+            return response
+        
+        try:
+            data = decode_response(response)
+        except ValueError:
+            data = None
+        retry_after, is_global = retry_after_from(response.headers, data)
+        limiter.on_rate_limited(route, retry_after, is_global)
+    
+    return response
+
+def close_session():
+    """共有セッションを閉じる"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,20 @@
+import json
+
+# インストールされている中で最も高速なJSONライブラリを使う（なければ標準ライブラリ）
+# いずれも不正な入力に対してはValueErrorのサブクラスを送出する
+try:
+    import orjson
+    BACKEND = 'orjson'
+    loads = orjson.loads
+except ImportError:
+    try:
+        import ujson
+        BACKEND = 'ujson'
+        loads = ujson.loads
+    except ImportError:
+        BACKEND = 'json'
+        loads = json.loads
+
+def decode_response(response):
+    """requestsのレスポンス本文をJSONとしてデコードする（response.json()の代わり）"""
+    return loads(response.content)
@@ -4,10 +4,15 @@ import time
 import os
 
 try:
+    # Selenium関連のモジュールはブラウザを使う場合にのみ読み込む（起動時間の短縮）
     from config import load_config
-    from selenium_manager import DiscordSeleniumManager
+    from read_state import ReadStateStore
+    from read_strategy import ChannelReader
+    from scheduler import ChannelScheduler
+    import metrics
+    import tracing
 except ModuleNotFoundError as e:
-    if "No module named 'dotenv'" in str(e) or "No module named 'selenium'" in str(e):
+    if "No module named 'dotenv'" in str(e) or "No module named 'requests'" in str(e):
         print("必要なパッケージがインストールされていません。")
         print("以下のコマンドを実行してインストールしてください：")
         print("pip install python-dotenv requests selenium webdriver-manager")
@@ -30,66 +35,203 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def process_channel_selenium(config, selenium_manager):
-    try:
-        server_id = config.get('server_id', '@me')  # サーバーIDがない場合は@meを使用
-        channel_id = config['channel_id']
+def process_channels_batch(channels, reader):
+    """
+    チャンネルを順に既読にする
+    
+    ブラウザを使う場合も1つのセッションを全チャンネルで共有する。
+    
+    Args:
+        channels (list): server_idとchannel_idを持つ辞書のリスト
+        reader (ChannelReader): 既読方法を選択するChannelReader
+        
+    Returns:
+        list: チャンネルごとの結果（server_id, channel_id, success, skipped, strategy, elapsed）のリスト
+    """
+    results = []
+    batch_start = time.time()
+    
+    for index, channel in enumerate(channels, 1):
+        channel_id = channel['channel_id']
+        logger.info(f"[{index}/{len(channels)}] チャンネル {channel_id} を処理しています")
         
-        # Seleniumを使用してチャンネルを既読にする
-        success = selenium_manager.mark_as_read(server_id, channel_id)
+        result = reader.mark_as_read(channel['server_id'], channel_id, channel.get('last_message_id'))
+        results.append(result)
         
-        if success:
-            logger.info("チャンネルを正常に既読にしました")
-            return True
-        else:
-            logger.error("チャンネルの既読処理に失敗しました")
-            return False
+        status = '変更なしのためスキップ' if result['skipped'] else ('成功' if result['success'] else '失敗')
+        logger.info(f"[{index}/{len(channels)}] チャンネル {channel_id}: {status}（{result['strategy']}） ({result['elapsed']:.2f}秒)")
+    
+    succeeded = sum(1 for result in results if result['success'])
+    skipped_count = sum(1 for result in results if result['skipped'])
+    logger.info(f"一括処理が完了しました: 成功 {succeeded}件（うちスキップ {skipped_count}件） / 失敗 {len(results) - succeeded}件 / 合計 {time.time() - batch_start:.2f}秒")
+    reader.log_stats()
+    return results
+
+def run_sweep(channels, reader, pool=None, scanner=None, acker=None):
+    """
+    チャンネルを1回ずつ処理する（ワーカープールがあれば並行処理する）
+    
+    scannerを指定した場合は、サーバーのチャンネル一覧で未読と判定したチャンネルだけを処理する。
+    ackerを指定した場合は、APIによる既読をまとめて送信する。
+    """
+    if reader is not None:
+        reader.start_sweep()
+    skipped = []
+    if scanner is not None:
+        channels, skipped = scanner.split_unread(channels)
+        if not channels:
+            return skipped
+    if pool is not None:
+        return skipped + pool.run(channels)
+    try:
+        if acker is not None:
+            start_time = time.time()
+            results = reader.mark_many_as_read(channels, acker)
+            succeeded = sum(1 for result in results if result['success'])
+            logger.info(f"一括処理が完了しました: 成功 {succeeded}件 / 失敗 {len(results) - succeeded}件 / 合計 {time.time() - start_time:.2f}秒")
+            reader.log_stats()
+            return skipped + results
+        return skipped + process_channels_batch(channels, reader)
+    finally:
+        # 既読位置はチャンネルごとではなく一括処理ごとに1回だけ保存する
+        if reader.read_state is not None:
+            reader.read_state.save()
+
+async def main_async(config, read_state=None):
+    """APIを並行呼び出しして全チャンネルを既読にする（asyncモード）"""
+    import asyncio
+    from async_client import mark_channels_as_read
+    
+    logger.info(f"asyncモードを使用します（同時実行数: {config['concurrency']}）")
+    scheduler = ChannelScheduler(config['channels'], config) if config['update_interval'] > 0 else None
+    
+    while True:
+        channels = scheduler.pop_due() if scheduler else config['channels']
+        if channels:
+            start_time = time.time()
+            with tracing.span('main.sweep', channels=len(channels)):
+                results = await mark_channels_as_read(config, channels, config['concurrency'], read_state)
             
-    except Exception as e:
-        logger.error(f"Seleniumチャンネル処理中にエラーが発生しました: {e}")
-        return False
+            for result in results:
+                status = '変更なしのためスキップ' if result['skipped'] else ('成功' if result['success'] else '失敗')
+                logger.info(f"チャンネル {result['channel_id']}: {status} ({result['elapsed']:.2f}秒)")
+                if scheduler:
+                    scheduler.report(result)
+            succeeded = sum(1 for result in results if result['success'])
+            logger.info(f"一括処理が完了しました: 成功 {succeeded}件 / 失敗 {len(results) - succeeded}件 / 合計 {time.time() - start_time:.2f}秒")
+            
+            if scheduler is None:
+                return results
+        
+        await asyncio.sleep(scheduler.seconds_until_next())
+
+def start_metrics(config):
+    """設定に応じてメトリクスのHTTP公開と定期的なJSON出力を開始する"""
+    if config.get('metrics_port'):
+        try:
+            metrics.start_http_server(config['metrics_port'])
+        except OSError as e:
+            logger.warning(f"メトリクスのHTTPサーバーを起動できませんでした（ポート {config['metrics_port']}）: {e}")
+    if config.get('metrics_file'):
+        metrics.start_json_dump(config['metrics_file'], config['metrics_interval'])
 
 def main():
     """Discordチャンネル既読処理のメイン関数"""
-    selenium_manager = None
+    reader = None
+    pool = None
+    config = {}
     
     try:
         # 設定の読み込み
         config = load_config()
-        channel_id = config['channel_id']
         update_interval = config['update_interval']
         
-        # SeleniumマネージャーAPI失敗対策のため使用
-        logger.info("ブラウザ自動化モード（Selenium）を使用します")
-        selenium_manager = DiscordSeleniumManager(config)
+        if config['trace_file']:
+            tracing.start(config['trace_file'])
+        
+        # 前回既読にした位置と比較して、変更のないチャンネルをスキップする
+        # サーバー単位の未読判定は既読位置との比較で行うため、スキップの設定によらず読み込む
+        read_state = ReadStateStore(config['read_state_file']) if config['skip_unchanged'] or config['guild_scan'] else None
+        
+        start_metrics(config)
+        
+        if config['mode'] in ('async', 'gateway'):
+            import asyncio
+            if config['guild_scan'] or config['bulk_ack']:
+                logger.warning(f"--guild-scanと--bulk-ackは{config['mode']}モードでは使用されません")
+            try:
+                if config['mode'] == 'gateway':
+                    from gateway import run_gateway
+                    logger.info("gatewayモードを使用します（新着メッセージのイベントで既読にします）")
+                    asyncio.run(run_gateway(config, read_state))
+                else:
+                    asyncio.run(main_async(config, read_state))
+                logger.info("Discordチャンネル既読処理が完了しました")
+            except ModuleNotFoundError as e:
+                logger.error(f"{config['mode']}モードにはaiohttpが必要です（pip install aiohttp）: {e}")
+                sys.exit(1)
+            except KeyboardInterrupt:
+                logger.info("ユーザーによって処理が中断されました")
+            return
+        
+        # ブラウザはSeleniumモードか、hybridモードでAPIによる既読に失敗した場合のみ起動する
+        if config['browser_workers'] > 1 and config['mode'] != 'rest':
+            from browser_pool import BrowserPool
+            pool = BrowserPool(config, read_state)
+        else:
+            # Seleniumマネージャーはブラウザでの既読処理が必要になった時点で作成される
+            reader = ChannelReader(config, read_state=read_state)
+        
+        acker = None
+        if config['bulk_ack']:
+            if config['mode'] == 'selenium' or pool is not None:
+                logger.warning("--bulk-ackはブラウザワーカーを使わないhybrid・restモードでのみ使用されます")
+            else:
+                from mark_read import BulkAcker
+                acker = BulkAcker(config)
+                logger.info(f"APIによる既読をまとめて送信します（最大 {acker.max_batch_size}件）")
+        
+        scanner = None
+        if config['guild_scan']:
+            from guild_scan import GuildScanner
+            scanner = GuildScanner(config, read_state)
+            logger.info("サーバーのチャンネル一覧で未読を判定します")
         
-        # 初回ログイン
-        if not selenium_manager.login():
-            logger.error("Discordへのログインに失敗しました")
-            sys.exit(1)
+        if config['mode'] == 'selenium':
+            logger.info("ブラウザ自動化モード（Selenium）を使用します")
+            # 初回ログイン
+            logged_in = pool.login_all() > 0 if pool else reader.get_selenium_manager().login()
+            if not logged_in:
+                logger.error("Discordへのログインに失敗しました")
+                sys.exit(1)
+        else:
+            logger.info(f"{config['mode']}モードを使用します（APIによる既読を優先）")
         
         # 単発実行または定期実行
         if update_interval <= 0:
             # 単発実行
-            process_channel_selenium(config, selenium_manager)
+            with tracing.span('main.sweep', channels=len(config['channels'])):
+                run_sweep(config['channels'], reader, pool, scanner, acker)
             logger.info("Discordチャンネル既読処理が完了しました")
         else:
-            # 定期実行
+            # 定期実行（チャンネルごとの間隔で実行時刻を迎えたものだけを処理する）
             logger.info(f"{update_interval}秒ごとに更新を実行します。Ctrl+Cで終了できます。")
+            scheduler = ChannelScheduler(config['channels'], config)
             try:
                 while True:
-                    start_time = time.time()
-                    
-                    success = process_channel_selenium(config, selenium_manager)
-                    if success:
-                        logger.info(f"更新が完了しました。次の更新まで待機中...")
-                    else:
-                        logger.warning("更新に失敗しました。次の更新まで待機中...")
-                    
-                    # 経過時間を考慮して、次の実行までの待機時間を計算
-                    elapsed = time.time() - start_time
-                    wait_time = max(0, update_interval - elapsed)
+                    channels = scheduler.pop_due()
+                    if channels:
+                        with tracing.span('main.sweep', channels=len(channels)):
+                            results = run_sweep(channels, reader, pool, scanner, acker)
+                        for result in results:
+                            scheduler.report(result)
+                        if all(result['success'] for result in results):
+                            logger.info(f"更新が完了しました。次の更新まで待機中...")
+                        else:
+                            logger.warning("更新に失敗しました。次の更新まで待機中...")
                     
+                    # 次のチャンネルの実行時刻まで待機する
+                    wait_time = scheduler.seconds_until_next()
                     if wait_time > 0:
                         time.sleep(wait_time)
             except KeyboardInterrupt:
@@ -98,13 +240,22 @@ def main():
     except ValueError as e:
         logger.error(f"設定エラー: {e}")
         sys.exit(1)
+    except ModuleNotFoundError as e:
+        logger.error(f"ブラウザでの既読処理に必要なパッケージがインストールされていません（pip install selenium webdriver-manager）: {e}")
+        sys.exit(1)
     except Exception as e:
         logger.error(f"予期しないエラーが発生しました: {e}", exc_info=True)
         sys.exit(1)
     finally:
         # Seleniumマネージャーのクリーンアップ
-        if selenium_manager:
-            selenium_manager.close()
+        if reader:
+            reader.close()
+        if pool:
+            pool.close()
+        # 終了時点のメトリクスを書き出す
+        if config.get('metrics_file'):
+            metrics.dump_json(config['metrics_file'])
+        tracing.stop()
 
 if __name__ == "__main__":
     main()
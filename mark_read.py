@@ -1,13 +1,16 @@
 import requests
+import json
 import logging
-import time
-from auth import get_token
+import threading
+from concurrent.futures import Future
+import metrics
+from auth import authorized_request
+from json_codec import decode_response
 
 # ロギング設定
 logger = logging.getLogger(__name__)
 
-BASE_URL = "https://discord.com/api/v9"
-
+@metrics.instrument('mark_read.ack')
 def mark_channel_as_read(channel_id, last_message_id, config=None):
     """
     特定のメッセージまでDiscordチャンネルを既読にする
@@ -20,32 +23,17 @@ def mark_channel_as_read(channel_id, last_message_id, config=None):
     Returns:
         dict: Discord APIからのレスポンス
     """
-    token = get_token(config)
-    
-    headers = {
-        "Authorization": token,
-        "Content-Type": "application/json",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
-    
     # Discord APIの既読エンドポイント
-    url = f"{BASE_URL}/channels/{channel_id}/messages/{last_message_id}/ack"
+    url = f"/channels/{channel_id}/messages/{last_message_id}/ack"
     
     logger.info(f"チャンネル {channel_id} をメッセージ {last_message_id} まで既読にしています")
     
     try:
-        response = requests.post(url, headers=headers)
-        
-        # レートリミット対応
-        if response.status_code == 429:
-            retry_after = response.json().get('retry_after', 5)
-            logger.warning(f"レート制限に達しました。{retry_after}秒後に再試行します")
-            time.sleep(retry_after)
-            return mark_channel_as_read(channel_id, last_message_id, config)
+        response = authorized_request('POST', url, config)
         
         response.raise_for_status()
         
-        result = response.json()
+        result = decode_response(response)
         logger.info(f"チャンネル {channel_id} を正常に既読にしました")
         return result
     
@@ -55,3 +43,161 @@ def mark_channel_as_read(channel_id, last_message_id, config=None):
     except requests.exceptions.RequestException as e:
         logger.error(f"チャンネルを既読にする際にエラーが発生しました: {e}")
         raise
+
+# 1回の一括既読リクエストに含めるチャンネル数の上限
+DEFAULT_BULK_ACK_BATCH_SIZE = 100
+# 最初のackを受け付けてから送信するまでの最大秒数
+DEFAULT_BULK_ACK_FLUSH_INTERVAL = 1.0
+# 一括既読のエンドポイント自体が使えないことを示すステータス
+_BULK_ACK_UNSUPPORTED_STATUSES = (404, 405)
+
+@metrics.instrument('mark_read.ack_bulk')
+def mark_channels_as_read_bulk(acks, config=None):
+    """
+    複数のチャンネルを1回のリクエストで既読にする
+    
+    Args:
+        acks (list): (チャンネルID, 既読にする最後のメッセージID) のタプルのリスト
+        config (dict): 設定情報
+        
+    Returns:
+        requests.Response: レスポンス
+    """
+    payload = {
+        "read_states": [
+            {"channel_id": channel_id, "message_id": message_id, "read_state_type": 0}
+            for channel_id, message_id in acks
+        ]
+    }
+    response = authorized_request('POST', '/read-states/ack-bulk', config, data=json.dumps(payload))
+    response.raise_for_status()
+    return response
+
+def _failed_ack(channel_id, message_id, error):
+    """送信に失敗したackの結果を作成する"""
+    return {'channel_id': channel_id, 'message_id': message_id, 'success': False, 'method': 'single', 'error': str(error)}
+
+class BulkAcker:
+    """
+    既読（ack）をまとめて一括既読のリクエストで送信するクラス（スレッドセーフ）
+
+    add()で受け付けたackは、件数がmax_batch_sizeに達するか、最初のackからflush_interval秒が
+    経過した時点で送信される。一括既読が拒否された場合はそのバッチを1件ずつのackで送り直し、
+    エンドポイント自体が使えない場合（404/405）は以降も1件ずつ送信する。
+    """
+
+    def __init__(self, config=None, max_batch_size=None, flush_interval=None):
+        """
+        コンストラクタ
+
+        Args:
+            config (dict): 設定情報
+            max_batch_size (int): 1回のリクエストに含めるチャンネル数の上限
+            flush_interval (float): 最初のackを受け付けてから送信するまでの最大秒数
+        """
+        config = config or {}
+        self.config = config
+        self.max_batch_size = max(1, int(max_batch_size or config.get('bulk_ack_batch_size') or DEFAULT_BULK_ACK_BATCH_SIZE))
+        self.flush_interval = float(flush_interval if flush_interval is not None else config.get('bulk_ack_flush_interval', DEFAULT_BULK_ACK_FLUSH_INTERVAL))
+        self.bulk_supported = True
+        self._pending = {}
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def add(self, channel_id, message_id):
+        """
+        ackを送信待ちに追加する
+
+        同じチャンネルのackが送信待ちにある場合は、新しい方のメッセージIDにまとめる。
+
+        Args:
+            channel_id (str): 既読にするチャンネルのID
+            message_id (str): 既読にする最後のメッセージのID
+
+        Returns:
+            Future: 結果（channel_id, message_id, success, method, error）を返すFuture
+        """
+        future = Future()
+        with self._lock:
+            entry = self._pending.get(channel_id)
+            if entry is None:
+                self._pending[channel_id] = [message_id, [future]]
+            else:
+                if int(message_id) > int(entry[0]):
+                    entry[0] = message_id
+                entry[1].append(future)
+            full = len(self._pending) >= self.max_batch_size
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+        return future
+
+    def flush(self):
+        """
+        送信待ちのackをすべて送信する
+
+        Returns:
+            list: 送信したチャンネルごとの結果
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        items = list(pending.items())
+        results = []
+        try:
+            for offset in range(0, len(items), self.max_batch_size):
+                batch = items[offset:offset + self.max_batch_size]
+                try:
+                    batch_results = self._send(batch)
+                except Exception as e:
+                    logger.error(f"既読の送信中にエラーが発生しました: {e}")
+                    batch_results = [_failed_ack(channel_id, message_id, e) for channel_id, (message_id, _) in batch]
+                for (channel_id, (message_id, futures)), result in zip(batch, batch_results):
+                    for future in futures:
+                        future.set_result(result)
+                    results.append(result)
+        finally:
+            # 途中で例外が発生しても、add()の呼び出し元がFutureを待ち続けないよう失敗として完了させる
+            for channel_id, (message_id, futures) in items:
+                for future in futures:
+                    if not future.done():
+                        future.set_result(_failed_ack(channel_id, message_id, 'ackが送信されませんでした'))
+        return results
+
+    def _send(self, batch):
+        """1バッチ分のackを送信し、チャンネルごとの結果を返す"""
+        acks = [(channel_id, message_id) for channel_id, (message_id, _) in batch]
+        if self.bulk_supported and len(acks) > 1:
+            try:
+                mark_channels_as_read_bulk(acks, self.config)
+                logger.info(f"{len(acks)}件のチャンネルを一括で既読にしました")
+                return [{'channel_id': channel_id, 'message_id': message_id, 'success': True, 'method': 'bulk', 'error': None}
+                        for channel_id, message_id in acks]
+            except requests.exceptions.HTTPError as e:
+                if e.response is not None and e.response.status_code in _BULK_ACK_UNSUPPORTED_STATUSES:
+                    self.bulk_supported = False
+                logger.warning(f"一括既読が拒否されました。1件ずつ既読にします: {e}")
+            except Exception as e:
+                logger.warning(f"一括既読に失敗しました。1件ずつ既読にします: {e}")
+            metrics.inc('bulk_ack_fallbacks_total')
+
+        results = []
+        for channel_id, message_id in acks:
+            try:
+                mark_channel_as_read(channel_id, message_id, self.config)
+                results.append({'channel_id': channel_id, 'message_id': message_id, 'success': True, 'method': 'single', 'error': None})
+            except Exception as e:
+                results.append(_failed_ack(channel_id, message_id, e))
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
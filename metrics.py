@@ -0,0 +1,213 @@
+import functools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+import tracing
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# メトリクス名の接頭辞
+PREFIX = 'discord_reader_'
+
+# ヒストグラムのバケット（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_SNOWFLAKE_PATTERN = re.compile(r'/\d{15,}')
+
+def route_label(route):
+    """レート制限のルートキーからIDを除き、ラベルの種類がチャンネル数に比例して増えないようにする"""
+    return _SNOWFLAKE_PATTERN.sub('/{id}', route.split('?', 1)[0])
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+class MetricsRegistry:
+    """カウンターとヒストグラムをプロセス内で集計するクラス（スレッドセーフ）"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        """カウンターを増やす"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """ヒストグラムに値（秒）を記録する"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram['buckets'][index] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    @contextmanager
+    def timed(self, name, **labels):
+        """ブロックの所要時間をヒストグラムに記録する"""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start_time, **labels)
+
+    def snapshot(self):
+        """現在の値を辞書で返す（JSON出力用）"""
+        with self._lock:
+            counters = [
+                {'name': PREFIX + name, 'labels': dict(label_key), 'value': value}
+                for (name, label_key), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {
+                    'name': PREFIX + name,
+                    'labels': dict(label_key),
+                    'count': histogram['count'],
+                    'sum': histogram['sum'],
+                    'buckets': dict(zip((str(bound) for bound in self.buckets), histogram['buckets']))
+                }
+                for (name, label_key), histogram in sorted(self._histograms.items())
+            ]
+        return {'timestamp': time.time(), 'counters': counters, 'histograms': histograms}
+
+    def render_prometheus(self):
+        """Prometheusのテキスト形式で出力する"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+            histograms = [(key, dict(value, buckets=list(value['buckets']))) for key, value in histograms]
+
+        declared = set()
+        for (name, label_key), value in counters:
+            metric = PREFIX + name
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            lines.append(f"{metric}{_format_labels(label_key)} {value}")
+
+        for (name, label_key), histogram in histograms:
+            metric = PREFIX + name
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} histogram")
+                declared.add(metric)
+            for bound, count in zip(self.buckets, histogram['buckets']):
+                lines.append(f"{metric}_bucket{_format_labels(label_key, [('le', bound)])} {count}")
+            lines.append(f"{metric}_bucket{_format_labels(label_key, [('le', '+Inf')])} {histogram['count']}")
+            lines.append(f"{metric}_sum{_format_labels(label_key)} {histogram['sum']}")
+            lines.append(f"{metric}_count{_format_labels(label_key)} {histogram['count']}")
+
+        return '\n'.join(lines) + '\n'
+
+# プロセス全体で共有するレジストリ
+REGISTRY = MetricsRegistry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timed = REGISTRY.timed
+
+def instrument(phase):
+    """
+    関数の所要時間をphase_secondsヒストグラムに記録するデコレータ
+
+    例外が発生した場合はphase_errors_totalも増やす。トレースが有効な場合はスパンも記録する。
+
+    Args:
+        phase (str): フェーズ名（"selenium.login"など）
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                REGISTRY.inc('phase_errors_total', phase=phase)
+                raise
+            finally:
+                duration = time.perf_counter() - start_time
+                REGISTRY.observe('phase_seconds', duration, phase=phase)
+                tracing.record(phase, start_time, duration)
+        return wrapper
+    return decorator
+
+def start_http_server(port, host='127.0.0.1'):
+    """
+    Prometheus形式のメトリクスを返すHTTPサーバーを別スレッドで起動する
+
+    Args:
+        port (int): 待ち受けるポート
+        host (str): 待ち受けるアドレス（デフォルトはローカルのみ）
+
+    Returns:
+        ThreadingHTTPServer: 起動したサーバー
+    """
+    # http.serverは読み込みに時間がかかるため、公開する場合にのみ読み込む
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = REGISTRY.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"メトリクスを公開しています: http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+def dump_json(path):
+    """メトリクスをJSONファイルに書き出す（一時ファイル経由で置き換える）"""
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(REGISTRY.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"メトリクスを書き出せませんでした: {e}")
+
+def start_json_dump(path, interval=60):
+    """
+    メトリクスを一定間隔でJSONファイルに書き出すスレッドを起動する
+
+    Args:
+        path (str): 出力先ファイルのパス
+        interval (float): 書き出し間隔（秒）
+    """
+    def loop():
+        while True:
+            time.sleep(interval)
+            dump_json(path)
+
+    threading.Thread(target=loop, daemon=True).start()
+    logger.info(f"メトリクスを{interval}秒ごとに書き出します: {path}")
@@ -0,0 +1,209 @@
+import logging
+import os
+import re
+import threading
+import time
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# Discordのグローバルレート制限（1秒あたりのリクエスト数）
+DEFAULT_GLOBAL_RATE = 50
+# Retry-After等で待機する最大秒数
+MAX_WAIT = 60.0
+
+# チャンネルIDとサーバーIDはDiscordのバケットを分けるメジャーパラメータとして残す
+_MAJOR_PARAM_PATTERN = re.compile(r'^/(channels|guilds|webhooks)/(\d+)')
+_SNOWFLAKE_PATTERN = re.compile(r'/\d{15,}')
+
+def route_key(method, path):
+    """
+    リクエストをレート制限のルートに対応付けるキーを作成する
+
+    メジャーパラメータ以外のIDは"{id}"に置き換え、クエリ文字列は除外する。
+
+    Args:
+        method (str): HTTPメソッド
+        path (str): BASE_URLからの相対パス
+
+    Returns:
+        tuple: (ルートキー, メジャーパラメータ)
+    """
+    path = path.split('?', 1)[0]
+    match = _MAJOR_PARAM_PATTERN.match(path)
+    if match:
+        major = match.group(2)
+        rest = _SNOWFLAKE_PATTERN.sub('/{id}', path[match.end():])
+        normalized = f"/{match.group(1)}/{major}{rest}"
+    else:
+        major = ''
+        normalized = _SNOWFLAKE_PATTERN.sub('/{id}', path)
+    return f"{method.upper()} {normalized}", major
+
+class _Bucket:
+    """1つのレート制限バケットの状態"""
+
+    __slots__ = ('limit', 'remaining', 'reset_at', 'period')
+
+    def __init__(self):
+        self.limit = None
+        self.remaining = None
+        self.reset_at = 0.0
+        self.period = 1.0
+
+class RateLimiter:
+    """
+    グローバルとルートごとのトークンバケットでリクエストを事前に間引くクラス
+
+    X-RateLimit-*ヘッダーからバケットの状態を学習し、残数がなければ
+    送信前に待機させることで429の発生を防ぐ。
+    """
+
+    def __init__(self, global_rate=DEFAULT_GLOBAL_RATE):
+        """
+        コンストラクタ
+
+        Args:
+            global_rate (float): 1秒あたりに送信できるリクエスト数
+        """
+        self.global_rate = float(global_rate)
+        self._global_tokens = self.global_rate
+        self._global_updated = time.monotonic()
+        self._global_blocked_until = 0.0
+        self._route_buckets = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket_for(self, route):
+        key, major = route
+        bucket_id = self._route_buckets.get(key, key)
+        bucket_key = (bucket_id, major)
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            bucket = self._buckets[bucket_key] = _Bucket()
+        return bucket
+
+    def reserve(self, route):
+        """
+        リクエスト1回分の枠を予約し、送信前に待機すべき秒数を返す
+
+        Args:
+            route (tuple): route_keyの戻り値
+
+        Returns:
+            float: 待機秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+
+            # グローバルバケット（不足分は負の残数として予約する）
+            elapsed = now - self._global_updated
+            self._global_tokens = min(self.global_rate, self._global_tokens + elapsed * self.global_rate)
+            self._global_updated = now
+            self._global_tokens -= 1
+            delay = 0.0
+            if self._global_tokens < 0:
+                delay = -self._global_tokens / self.global_rate
+            delay = max(delay, self._global_blocked_until - now)
+
+            # ルートバケット
+            bucket = self._bucket_for(route)
+            if bucket.remaining is not None:
+                limit = bucket.limit or 1
+                if now >= bucket.reset_at:
+                    # 経過したウィンドウの分だけ枠を補充する（負の残数は先のウィンドウで予約済みの枠）
+                    windows = 1 + int((now - bucket.reset_at) // bucket.period)
+                    bucket.remaining = min(bucket.remaining + windows * limit, limit)
+                    bucket.reset_at += windows * bucket.period
+                bucket.remaining -= 1
+                if bucket.remaining < 0:
+                    # 現在のウィンドウは使い切っているので、予約した枠のウィンドウが始まるまで待つ
+                    windows_ahead = (-bucket.remaining - 1) // limit
+                    delay = max(delay, bucket.reset_at + windows_ahead * bucket.period - now)
+
+            return min(delay, MAX_WAIT)
+
+    def update(self, route, headers):
+        """
+        レスポンスのX-RateLimit-*ヘッダーからバケットの状態を更新する
+
+        Args:
+            route (tuple): route_keyの戻り値
+            headers (Mapping): レスポンスヘッダー（大文字小文字を区別しないもの）
+        """
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset_after = headers.get('X-RateLimit-Reset-After')
+        if remaining is None or reset_after is None:
+            return
+
+        with self._lock:
+            bucket_id = headers.get('X-RateLimit-Bucket')
+            if bucket_id:
+                self._route_buckets[route[0]] = bucket_id
+            bucket = self._bucket_for(route)
+            try:
+                limit = headers.get('X-RateLimit-Limit')
+                bucket.limit = int(limit) if limit else bucket.limit
+                bucket.remaining = int(remaining)
+                reset_after = float(reset_after)
+            except ValueError:
+                return
+            bucket.reset_at = time.monotonic() + reset_after
+            if reset_after > 0:
+                # 429などで一度だけ長いReset-Afterを受け取ってもウィンドウが伸びたままにならないよう、最新の値を使う
+                bucket.period = reset_after
+
+    def on_rate_limited(self, route, retry_after, is_global=False):
+        """
+        429を受け取った際にバケットをブロックする
+
+        Returns:
+            float: 再試行までに待機すべき秒数
+        """
+        retry_after = min(float(retry_after), MAX_WAIT)
+        with self._lock:
+            until = time.monotonic() + retry_after
+            if is_global:
+                self._global_blocked_until = max(self._global_blocked_until, until)
+            else:
+                bucket = self._bucket_for(route)
+                bucket.remaining = 0
+                bucket.reset_at = max(bucket.reset_at, until)
+        logger.warning(f"レート制限に達しました（{'グローバル' if is_global else route[0]}）。{retry_after:.2f}秒後に再試行します")
+        return retry_after
+
+    def acquire(self, route):
+        """枠が空くまでブロックして待機する"""
+        delay = self.reserve(route)
+        if delay > 0:
+            logger.debug(f"レート制限のため {delay:.2f}秒待機します: {route[0]}")
+            time.sleep(delay)
+
+    async def acquire_async(self, route):
+        """枠が空くまで非同期に待機する"""
+        # asyncioはasync/gatewayモードでのみ必要なため、ここで読み込む
+        import asyncio
+        delay = self.reserve(route)
+        if delay > 0:
+            logger.debug(f"レート制限のため {delay:.2f}秒待機します: {route[0]}")
+            await asyncio.sleep(delay)
+
+def retry_after_from(headers, data):
+    """429レスポンスから再試行までの秒数とグローバル制限かどうかを取得する"""
+    data = data if isinstance(data, dict) else {}
+    retry_after = data.get('retry_after') or headers.get('Retry-After') or 5
+    is_global = bool(data.get('global')) or headers.get('X-RateLimit-Global', '').lower() == 'true'
+    return float(retry_after), is_global
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_rate_limiter(config=None):
+    """プロセス全体で共有するRateLimiterを取得する"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                rate = (config or {}).get('global_rate_limit') or os.getenv('RATE_LIMIT_GLOBAL') or DEFAULT_GLOBAL_RATE
+                _limiter = RateLimiter(rate)
+    return _limiter
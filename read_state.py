@@ -0,0 +1,74 @@
+import json
+import os
+import logging
+import threading
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# チャンネルごとの既読位置を保存するファイル
+READ_STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.read_state')
+
+class ReadStateStore:
+    """チャンネルごとに最後に既読にしたメッセージIDを永続化するクラス"""
+    
+    def __init__(self, path=None):
+        """
+        コンストラクタ
+        
+        Args:
+            path (str): 保存先ファイルのパス
+        """
+        self.path = path or READ_STATE_FILE
+        self._lock = threading.Lock()
+        self._state = self._load()
+        self._dirty = False
+    
+    def _load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    return {str(k): str(v) for k, v in data.items()}
+        except Exception as e:
+            logger.warning(f"既読状態を読み込めませんでした: {e}")
+        return {}
+    
+    def save(self):
+        """既読状態をファイルに保存する（一時ファイル経由で置き換える。変更がなければ何もしない）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(self._state, f)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except Exception as e:
+                logger.warning(f"既読状態を保存できませんでした: {e}")
+    
+    def get(self, channel_id):
+        """最後に既読にしたメッセージIDを返す（未記録の場合はNone）"""
+        with self._lock:
+            return self._state.get(str(channel_id))
+    
+    def set(self, channel_id, message_id, save=True):
+        """
+        最後に既読にしたメッセージIDを記録する
+        
+        Args:
+            channel_id (str): チャンネルID
+            message_id (str): 既読にしたメッセージID
+            save (bool): すぐにファイルへ保存するかどうか
+        """
+        with self._lock:
+            self._state[str(channel_id)] = str(message_id)
+            self._dirty = True
+        if save:
+            self.save()
+    
+    def is_unchanged(self, channel_id, latest_message_id):
+        """最新メッセージIDが前回既読にしたものと同じかどうか"""
+        return latest_message_id is not None and self.get(channel_id) == str(latest_message_id)
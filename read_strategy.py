@@ -0,0 +1,252 @@
+import logging
+import time
+import metrics
+import tracing
+from auth import login_blocked
+from scraper import get_latest_message_id
+from mark_read import mark_channel_as_read
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# 処理モードごとの既読方法
+STRATEGY_MODES = ('selenium', 'hybrid', 'rest')
+
+class ChannelReader:
+    """
+    チャンネルの既読方法を選択するクラス
+
+    hybridモードではAPIによる既読（最新メッセージIDの取得とack）を先に試し、
+    失敗した場合のみブラウザでチャンネルを開く。
+    Seleniumマネージャーを渡さない場合は、ブラウザが必要になった時点で作成する
+    （APIだけで完了する実行ではSeleniumを読み込まない）。
+    """
+
+    def __init__(self, config, selenium_manager=None, read_state=None, watchdog=None):
+        """
+        コンストラクタ
+
+        Args:
+            config (dict): 設定情報
+            selenium_manager (DiscordSeleniumManager): フォールバック用のSeleniumマネージャー（省略時は必要になった時点で作成）
+            read_state (ReadStateStore): チャンネルごとの既読位置
+            watchdog (DriverWatchdog): ブラウザの状態を監視するウォッチドッグ（省略時はマネージャーと一緒に作成）
+        """
+        self.config = config
+        self.mode = config.get('mode', 'hybrid')
+        self.selenium_manager = selenium_manager
+        self.read_state = read_state
+        self.watchdog = watchdog
+        self.stats = {'rest': 0, 'bulk': 0, 'selenium': 0, 'fallback': 0, 'skipped': 0, 'failed': 0}
+        # ログインに失敗した一括処理では、以降のチャンネルでAPIを使わない
+        self.rest_blocked = False
+
+    def start_sweep(self):
+        """一括処理の開始時に呼び出す（前回の一括処理でのAPIの停止を解除する）"""
+        self.rest_blocked = False
+
+    def _check_login_failure(self):
+        """APIの失敗がログインの失敗によるものであれば、この一括処理ではAPIを使わないようにする"""
+        if not self.rest_blocked and login_blocked():
+            logger.warning("Discordへのログインに失敗したため、この一括処理ではAPIによる既読を行いません")
+            self.rest_blocked = True
+
+    def get_selenium_manager(self):
+        """
+        ブラウザでの既読処理に使うSeleniumマネージャーを返す
+
+        初回の呼び出し時にselenium_managerを読み込んで作成する（restモードでは作成しない）。
+
+        Returns:
+            DiscordSeleniumManager: Seleniumマネージャー（restモードではNone）
+        """
+        if self.selenium_manager is None and self.mode != 'rest':
+            from selenium_manager import DiscordSeleniumManager
+            from driver_watchdog import DriverWatchdog
+            self.selenium_manager = DiscordSeleniumManager(self.config)
+            if self.watchdog is None:
+                self.watchdog = DriverWatchdog(self.selenium_manager, self.config)
+        return self.selenium_manager
+
+    def _fetch_latest_message_id(self, channel_id):
+        """
+        最新メッセージIDを取得する
+
+        Returns:
+            tuple: (最新メッセージID, 取得に成功したかどうか)
+        """
+        try:
+            return get_latest_message_id(channel_id, self.config), True
+        except Exception as e:
+            logger.warning(f"チャンネル {channel_id} の最新メッセージIDを取得できませんでした: {e}")
+            self._check_login_failure()
+            return None, False
+
+    def _mark_with_rest(self, channel_id, message_id):
+        try:
+            mark_channel_as_read(channel_id, message_id, self.config)
+            return True
+        except Exception as e:
+            logger.warning(f"APIによる既読処理に失敗しました（チャンネル {channel_id}）: {e}")
+            self._check_login_failure()
+            return False
+
+    def _mark_with_selenium(self, server_id, channel_id):
+        try:
+            return self.get_selenium_manager().mark_as_read(server_id, channel_id)
+        except Exception as e:
+            logger.error(f"Seleniumチャンネル処理中にエラーが発生しました: {e}")
+            return False
+
+    def mark_as_read(self, server_id, channel_id, latest_message_id=None, skip_rest=False):
+        """
+        チャンネルを既読にする
+
+        Args:
+            server_id (str): サーバーID
+            channel_id (str): チャンネルID
+            latest_message_id (str): 判明している最新メッセージID（指定した場合は取得し直さない）
+            skip_rest (bool): APIでの取得と既読をすでに試して失敗している場合はTrue（hybridモードではブラウザのみを使う）
+
+        Returns:
+            dict: 結果（server_id, channel_id, success, skipped, strategy, elapsed）
+        """
+        start_time = time.perf_counter()
+        result = {
+            'server_id': server_id,
+            'channel_id': channel_id,
+            'success': False,
+            'skipped': False,
+            'strategy': None
+        }
+
+        use_rest = not self.rest_blocked and not skip_rest
+        fetched = latest_message_id is not None
+        if not fetched and use_rest and (self.mode != 'selenium' or self.read_state is not None):
+            latest_message_id, fetched = self._fetch_latest_message_id(channel_id)
+
+        if self.read_state is not None and self.read_state.is_unchanged(channel_id, latest_message_id):
+            result.update(success=True, skipped=True, strategy='skip')
+        elif self.mode != 'selenium' and fetched and latest_message_id is None:
+            # メッセージがないチャンネルは既読にするものがない
+            result.update(success=True, strategy='rest')
+        elif self.mode != 'selenium' and fetched and use_rest and self._mark_with_rest(channel_id, latest_message_id):
+            result.update(success=True, strategy='rest')
+        elif self.mode == 'rest':
+            result.update(strategy='rest')
+        else:
+            if self.mode == 'hybrid':
+                logger.info(f"チャンネル {channel_id} はブラウザでの既読処理にフォールバックします")
+                self.stats['fallback'] += 1
+            result.update(success=self._mark_with_selenium(server_id, channel_id), strategy='selenium')
+            if self.watchdog is not None:
+                self.watchdog.record(result['success'])
+                self.watchdog.maybe_recycle()
+
+        if result['success'] and not result['skipped'] and self.read_state is not None and latest_message_id:
+            # ファイルへの保存は一括処理の終了時にまとめて行う
+            self.read_state.set(channel_id, latest_message_id, save=False)
+
+        if result['skipped']:
+            self.stats['skipped'] += 1
+        elif result['success']:
+            self.stats[result['strategy']] += 1
+        else:
+            self.stats['failed'] += 1
+
+        result['elapsed'] = time.perf_counter() - start_time
+        tracing.record('reader.mark_as_read', start_time, result['elapsed'], channel_id=channel_id, strategy=result['strategy'], success=result['success'])
+        metrics.inc('channels_total', strategy=result['strategy'], success=result['success'])
+        metrics.observe('channel_seconds', result['elapsed'], strategy=result['strategy'])
+        return result
+
+    def mark_many_as_read(self, channels, acker):
+        """
+        複数のチャンネルを既読にし、ackをまとめて送信する（hybrid・restモード）
+
+        最新メッセージIDの確認はチャンネルごとに行い（last_message_idが判明していれば省略）、
+        ackだけをBulkAckerでまとめる。ackに失敗したチャンネルと最新メッセージIDを確認できなかった
+        チャンネルは、APIを再度試さずにhybridモードではブラウザにフォールバックし、restモードでは失敗とする
+        （BulkAckerは一括既読の失敗時にすでに1件ずつのackを試している）。
+
+        Args:
+            channels (list): server_idとchannel_id（判明していればlast_message_id）を持つ辞書のリスト
+            acker (BulkAcker): ackをまとめて送信するBulkAcker
+
+        Returns:
+            list: チャンネルごとの結果（入力と同じ順序）
+        """
+        start_time = time.perf_counter()
+        results = [None] * len(channels)
+        queued = []
+        # APIでの処理に失敗したチャンネル（位置と判明している最新メッセージID）
+        rest_failed = {}
+
+        for index, channel in enumerate(channels):
+            if self.rest_blocked:
+                break
+            channel_id = channel['channel_id']
+            latest_message_id = channel.get('last_message_id')
+            if latest_message_id is None:
+                latest_message_id, fetched = self._fetch_latest_message_id(channel_id)
+                if not fetched:
+                    rest_failed[index] = None
+                    continue
+
+            result = {'server_id': channel['server_id'], 'channel_id': channel_id, 'success': True, 'skipped': False, 'strategy': 'rest'}
+            if self.read_state is not None and self.read_state.is_unchanged(channel_id, latest_message_id):
+                result.update(skipped=True, strategy='skip')
+                self.stats['skipped'] += 1
+            elif latest_message_id is None:
+                # メッセージがないチャンネルは既読にするものがない
+                self.stats['rest'] += 1
+            else:
+                queued.append((index, channel, latest_message_id, acker.add(channel_id, latest_message_id)))
+                continue
+            result['elapsed'] = time.perf_counter() - start_time
+            results[index] = result
+            metrics.inc('channels_total', strategy=result['strategy'], success=True)
+
+        acker.flush()
+        if any(not future.result()['success'] for _, _, _, future in queued):
+            self._check_login_failure()
+        for index, channel, latest_message_id, future in queued:
+            ack = future.result()
+            if not ack['success']:
+                rest_failed[index] = latest_message_id
+                continue
+            strategy = 'bulk' if ack['method'] == 'bulk' else 'rest'
+            self.stats[strategy] += 1
+            if self.read_state is not None:
+                self.read_state.set(channel['channel_id'], latest_message_id, save=False)
+            results[index] = {
+                'server_id': channel['server_id'],
+                'channel_id': channel['channel_id'],
+                'success': True,
+                'skipped': False,
+                'strategy': strategy,
+                'elapsed': time.perf_counter() - start_time
+            }
+            metrics.inc('channels_total', strategy=strategy, success=True)
+
+        for index, channel in enumerate(channels):
+            if results[index] is not None:
+                continue
+            if index in rest_failed:
+                results[index] = self.mark_as_read(channel['server_id'], channel['channel_id'], rest_failed[index], skip_rest=True)
+            else:
+                # ログインの失敗でAPIを止めたため未処理のチャンネル
+                results[index] = self.mark_as_read(channel['server_id'], channel['channel_id'], channel.get('last_message_id'))
+
+        tracing.record('reader.mark_many_as_read', start_time, time.perf_counter() - start_time, channels=len(channels), acks=len(queued))
+        return results
+
+    def close(self):
+        """作成済みのブラウザを閉じる"""
+        if self.selenium_manager is not None:
+            self.selenium_manager.close()
+
+    def log_stats(self):
+        """既読方法ごとの件数をログに出力する"""
+        stats = self.stats
+        logger.info(f"既読方法の内訳: API {stats['rest']}件 / 一括API {stats['bulk']}件 / ブラウザ {stats['selenium']}件（うちフォールバック {stats['fallback']}件） / スキップ {stats['skipped']}件 / 失敗 {stats['failed']}件")
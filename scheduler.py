@@ -0,0 +1,121 @@
+import heapq
+import itertools
+import logging
+import random
+import time
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# スケジューラのデフォルト設定
+DEFAULT_JITTER = 0.1
+DEFAULT_BACKOFF_FACTOR = 1.5
+DEFAULT_MAX_INTERVAL_FACTOR = 10
+
+class _ScheduledChannel:
+    """スケジュール対象の1チャンネルの状態"""
+
+    __slots__ = ('channel', 'base_interval', 'interval', 'priority', 'next_run', 'failures')
+
+    def __init__(self, channel, base_interval, priority):
+        self.channel = channel
+        self.base_interval = base_interval
+        self.interval = base_interval
+        self.priority = priority
+        self.next_run = 0.0
+        self.failures = 0
+
+class ChannelScheduler:
+    """
+    チャンネルごとの間隔で処理タイミングを管理するスケジューラ
+
+    各チャンネルは個別の間隔（揺らぎ付き）で実行され、同時に実行時刻を迎えた場合は
+    優先度の数値が小さいものから処理する。新着のないチャンネルは間隔を徐々に延ばし、
+    失敗が続くチャンネルは指数的に後回しにして他のチャンネルの処理を妨げないようにする。
+    """
+
+    def __init__(self, channels, config):
+        """
+        コンストラクタ
+
+        Args:
+            channels (list): server_id、channel_id（任意でinterval、priority）を持つ辞書のリスト
+            config (dict): 設定情報
+        """
+        default_interval = float(config['update_interval'])
+        self.jitter = float(config.get('schedule_jitter', DEFAULT_JITTER))
+        self.backoff_factor = float(config.get('schedule_backoff', DEFAULT_BACKOFF_FACTOR))
+        self.max_interval = config.get('schedule_max_interval')
+        self._counter = itertools.count()
+        self._heap = []
+        self._entries = {}
+
+        now = time.monotonic()
+        for channel in channels:
+            entry = _ScheduledChannel(
+                channel,
+                float(channel.get('interval') or default_interval),
+                int(channel.get('priority') or 0)
+            )
+            entry.next_run = now
+            self._entries[channel['channel_id']] = entry
+            self._push(entry)
+
+    def _push(self, entry):
+        heapq.heappush(self._heap, (entry.next_run, entry.priority, next(self._counter), entry))
+
+    def _max_interval_for(self, entry):
+        if self.max_interval:
+            return float(self.max_interval)
+        return entry.base_interval * DEFAULT_MAX_INTERVAL_FACTOR
+
+    def _jittered(self, interval):
+        if self.jitter <= 0:
+            return interval
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def pop_due(self):
+        """
+        実行時刻を迎えたチャンネルを取り出す
+
+        Returns:
+            list: 優先度順に並べたチャンネルの辞書のリスト
+        """
+        now = time.monotonic()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[3])
+        due.sort(key=lambda entry: entry.priority)
+        return [entry.channel for entry in due]
+
+    def report(self, result):
+        """
+        処理結果をもとに次回の実行時刻を決める
+
+        Args:
+            result (dict): channel_id、success、skippedを持つ結果
+        """
+        entry = self._entries.get(result['channel_id'])
+        if entry is None:
+            return
+
+        if not result['success']:
+            entry.failures += 1
+            entry.interval = min(entry.base_interval * (2 ** entry.failures), self._max_interval_for(entry))
+            logger.info(f"チャンネル {result['channel_id']} は {entry.failures}回連続で失敗したため、{entry.interval:.0f}秒後に再試行します")
+        elif result.get('skipped'):
+            # 新着がなければ間隔を延ばす
+            entry.failures = 0
+            entry.interval = min(entry.interval * self.backoff_factor, self._max_interval_for(entry))
+        else:
+            entry.failures = 0
+            entry.interval = entry.base_interval
+
+        entry.next_run = time.monotonic() + self._jittered(entry.interval)
+        self._push(entry)
+
+    def seconds_until_next(self):
+        """次のチャンネルの実行時刻までの秒数を返す"""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
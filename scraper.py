@@ -1,56 +1,223 @@
 import requests
 import logging
-import time
-from auth import get_token
+import metrics
+from auth import authorized_request
+from json_codec import decode_response
 
 # ロギング設定
 logger = logging.getLogger(__name__)
 
-BASE_URL = "https://discord.com/api/v9"
+# Discord APIが1回のリクエストで返すメッセージ数の上限
+MAX_PAGE_SIZE = 100
 
-def get_channel_messages(channel_id, limit=50, config=None):
+# Discordのスノーフレークの基準時刻（2015-01-01T00:00:00Z、ミリ秒）
+DISCORD_EPOCH_MS = 1420070400000
+
+# コンパクト形式で保持する項目
+COMPACT_FIELDS = ('id', 'channel_id', 'author_id', 'timestamp', 'content_length')
+DEFAULT_COMPACT_FIELDS = ('id', 'channel_id', 'author_id', 'timestamp')
+
+def snowflake_to_timestamp(snowflake):
+    """スノーフレークIDから作成時刻（UNIX時間、秒）を求める"""
+    return ((int(snowflake) >> 22) + DISCORD_EPOCH_MS) / 1000
+
+class CompactMessage:
+    """
+    必要な項目だけを保持するメッセージ
+
+    IDはint、timestampはスノーフレークから求めたUNIX時間（秒）で保持する。
+    保持しない項目はNoneになる。
+    """
+    
+    __slots__ = COMPACT_FIELDS
+    
+    def __init__(self, id=None, channel_id=None, author_id=None, timestamp=None, content_length=None):
+        self.id = id
+        self.channel_id = channel_id
+        self.author_id = author_id
+        self.timestamp = timestamp
+        self.content_length = content_length
+    
+    @classmethod
+    def from_dict(cls, data, fields=DEFAULT_COMPACT_FIELDS):
+        """
+        APIのメッセージオブジェクトから必要な項目だけを取り出す
+        
+        Args:
+            data (dict): APIのメッセージオブジェクト
+            fields (tuple): 保持する項目（COMPACT_FIELDSの部分集合）
+            
+        Returns:
+            CompactMessage: コンパクト形式のメッセージ
+        """
+        message = cls()
+        message_id = int(data['id'])
+        if 'id' in fields:
+            message.id = message_id
+        if 'channel_id' in fields:
+            message.channel_id = int(data['channel_id'])
+        if 'author_id' in fields and data.get('author'):
+            message.author_id = int(data['author']['id'])
+        if 'timestamp' in fields:
+            message.timestamp = snowflake_to_timestamp(message_id)
+        if 'content_length' in fields:
+            message.content_length = len(data.get('content') or '')
+        return message
+    
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__ if getattr(self, name) is not None)
+        return f"CompactMessage({values})"
+
+def get_compact_fields(config=None):
+    """設定からコンパクト形式で保持する項目を取得する"""
+    fields = (config or {}).get('compact_fields')
+    if not fields:
+        return DEFAULT_COMPACT_FIELDS
+    unknown = set(fields) - set(COMPACT_FIELDS)
+    if unknown:
+        raise ValueError(f"コンパクト形式でサポートされていない項目: {', '.join(sorted(unknown))}")
+    return tuple(fields)
+
+@metrics.instrument('scraper.fetch_page')
+def _fetch_page(channel_id, limit, before=None, after=None, config=None):
+    """メッセージを1ページ分取得する（Discord APIの返す新しい順のまま）"""
+    url = f"/channels/{channel_id}/messages?limit={limit}"
+    if before:
+        url += f"&before={before}"
+    if after:
+        url += f"&after={after}"
+    
+    try:
+        response = authorized_request('GET', url, config)
+        
+        response.raise_for_status()
+        
+        return decode_response(response)
+    
+    except requests.exceptions.HTTPError as e:
+        logger.error(f"メッセージ取得中にHTTPエラーが発生しました: {e}")
+        raise
+    except requests.exceptions.RequestException as e:
+        logger.error(f"メッセージ取得中にエラーが発生しました: {e}")
+        raise
+
+def iter_channel_messages(channel_id, limit=None, before=None, after=None, page_size=MAX_PAGE_SIZE, config=None, compact=False):
+    """
+    Discordチャンネルのメッセージをページ単位で取得しながら1件ずつ返す
+    
+    afterを指定した場合は古い順に、それ以外は新しい順に返す。メモリに保持するのは
+    1ページ分だけなので、件数の多いチャンネルでも使用量は一定になる。
+    中断した場合は最後に受け取ったメッセージのIDを、同じ向きのbefore/afterに
+    渡すことで続きから再開できる。
+    
+    Args:
+        channel_id (str): メッセージを取得するチャンネルのID
+        limit (int): 取得するメッセージの最大数（Noneの場合は末尾まで）
+        before (str): このIDより前（古い）のメッセージを取得する
+        after (str): このIDより後（新しい）のメッセージを取得する
+        page_size (int): 1回のリクエストで取得する件数（最大100）
+        config (dict): 設定情報
+        compact (bool): CompactMessageに変換して返すかどうか
+        
+    Yields:
+        dict: メッセージオブジェクト（compactの場合はCompactMessage）
+    """
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    remaining = limit
+    fields = get_compact_fields(config) if compact else None
+    
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        if after:
+            page = _fetch_page(channel_id, size, after=after, config=config)
+            # APIは新しい順に返すので、古い順に並べ替える
+            page.reverse()
+        else:
+            page = _fetch_page(channel_id, size, before=before, config=config)
+        
+        logger.debug(f"チャンネル {channel_id} から {len(page)} 件のメッセージを取得しました")
+        if not page:
+            return
+        cursor = page[-1]['id']
+        
+        if compact:
+            # 元の辞書はページごとに破棄し、必要な項目だけを残す
+            page = [CompactMessage.from_dict(message, fields) for message in page]
+        for message in page:
+            yield message
+        
+        if remaining is not None:
+            remaining -= len(page)
+        if len(page) < size:
+            return
+        
+        if after:
+            after = cursor
+        else:
+            before = cursor
+
+def get_channel_messages(channel_id, limit=50, config=None, compact=False):
     """
     Discordチャンネルからメッセージを取得する
     
+    limitが1ページの上限を超える場合は、複数ページに分けて取得する。
+    
     Args:
         channel_id (str): メッセージを取得するチャンネルのID
         limit (int): 取得するメッセージの最大数
         config (dict): 設定情報
+        compact (bool): CompactMessageに変換して返すかどうか
         
     Returns:
-        list: メッセージオブジェクトのリスト
+        list: メッセージオブジェクト（compactの場合はCompactMessage）のリスト
     """
-    token = get_token(config)
+    logger.info(f"チャンネル {channel_id} からメッセージを取得しています")
     
-    headers = {
-        "Authorization": token,
-        "Content-Type": "application/json",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
+    messages = list(iter_channel_messages(channel_id, limit=limit, config=config, compact=compact))
+    logger.info(f"チャンネル {channel_id} から {len(messages)} 件のメッセージを取得しました")
+    return messages
+
+def get_latest_message_id(channel_id, config=None):
+    """
+    チャンネルの最新メッセージIDを取得する
     
-    url = f"{BASE_URL}/channels/{channel_id}/messages?limit={limit}"
+    Args:
+        channel_id (str): チャンネルID
+        config (dict): 設定情報
+        
+    Returns:
+        str: 最新メッセージのID（メッセージがない場合はNone）
+    """
+    messages = get_channel_messages(channel_id, limit=1, config=config)
+    return messages[0]['id'] if messages else None
+
+@metrics.instrument('scraper.list_guild_channels')
+def list_guild_channels(guild_id, config=None):
+    """
+    サーバーのチャンネル一覧を取得する
     
-    logger.info(f"チャンネル {channel_id} からメッセージを取得しています")
+    各チャンネルにはlast_message_id（最新メッセージのID）が含まれるため、
+    1回のリクエストでサーバー内の全チャンネルの新着の有無を判定できる。
     
-    try:
-        response = requests.get(url, headers=headers)
+    Args:
+        guild_id (str): サーバーID
+        config (dict): 設定情報
         
-        # レートリミット対応
-        if response.status_code == 429:
-            retry_after = response.json().get('retry_after', 5)
-            logger.warning(f"レート制限に達しました。{retry_after}秒後に再試行します")
-            time.sleep(retry_after)
-            return get_channel_messages(channel_id, limit, config)
+    Returns:
+        list: チャンネルオブジェクトのリスト
+    """
+    try:
+        response = authorized_request('GET', f"/guilds/{guild_id}/channels", config)
         
         response.raise_for_status()
         
-        messages = response.json()
-        logger.info(f"チャンネル {channel_id} から {len(messages)} 件のメッセージを取得しました")
-        return messages
+        channels = decode_response(response)
+        logger.debug(f"サーバー {guild_id} のチャンネル {len(channels)} 件を取得しました")
+        return channels
     
     except requests.exceptions.HTTPError as e:
-        logger.error(f"メッセージ取得中にHTTPエラーが発生しました: {e}")
+        logger.error(f"チャンネル一覧の取得中にHTTPエラーが発生しました: {e}")
         raise
     except requests.exceptions.RequestException as e:
-        logger.error(f"メッセージ取得中にエラーが発生しました: {e}")
+        logger.error(f"チャンネル一覧の取得中にエラーが発生しました: {e}")
         raise
@@ -7,16 +7,70 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
-from webdriver_manager.firefox import GeckoDriverManager
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.firefox.service import Service as FirefoxService
-from selenium.webdriver.edge.service import Service as EdgeService
+import metrics
+import tracing
+from driver_cache import resolve_driver_path
 
 # ロギング設定
 logger = logging.getLogger(__name__)
 
+# DiscordのWebクライアントのURL（ローカルの検証用サーバーに向ける場合は環境変数で上書きする）
+WEB_BASE_URL = os.getenv('DISCORD_WEB_BASE', 'https://discord.com').rstrip('/')
+
+# チャンネルのメッセージ一覧（またはメッセージのない空のチャンネル表示）
+MESSAGE_LIST_SELECTOR = 'ol[data-list-id="chat-messages"], [class*="messagesWrapper"] ol, [class*="emptyChannel"]'
+# 未読の区切り線と「新しいメッセージ」バー
+UNREAD_MARKER_SELECTOR = '[id="---new-messages-bar"], [class*="newMessagesBar"], [class*="isUnread"][class*="divider"]'
+
+# 表示中で有効な既読ボタンを1回のスクリプト実行で探す（「既読にする」を優先し、なければ「既読」を含むもの）
+FIND_READ_BUTTON_SCRIPT = """
+const candidates = [];
+for (const button of document.querySelectorAll('button')) {
+    if (button.disabled) continue;
+    const text = button.innerText || '';
+    if (!text.includes('既読')) continue;
+    const rect = button.getBoundingClientRect();
+    if (rect.width === 0 || rect.height === 0) continue;
+    if (text.includes('既読にする')) return button;
+    candidates.push(button);
+}
+return candidates.length ? candidates[0] : null;
+"""
+
+# ログイン済みの画面にだけ表示されるサーバー一覧
+LOGGED_IN_SELECTOR = '[data-list-id="guildsnav"], nav[class*="guilds"]'
+
+# 軽量プロファイルでブロックするリソース（画像・動画・フォント・アバター等）
+LEAN_BLOCKED_URLS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif',
+    '*.mp4', '*.webm', '*.mp3', '*.ogg',
+    '*.woff', '*.woff2', '*.ttf', '*.otf',
+    '*cdn.discordapp.com/avatars/*', '*cdn.discordapp.com/emojis/*', '*media.discordapp.net/*'
+]
+
+# 軽量プロファイルのメモリ・キャッシュ上限（MB）
+DEFAULT_LEAN_MEMORY_MB = 512
+DEFAULT_LEAN_CACHE_MB = 32
+
+# 各待機の上限秒数（デフォルト）
+DEFAULT_PAGE_READY_TIMEOUT = 10
+DEFAULT_READ_STATE_TIMEOUT = 3
+DEFAULT_CLICK_SETTLE_TIMEOUT = 2
+DEFAULT_SESSION_CHECK_TIMEOUT = 10
+
+# webdriver_managerはドライバのキャッシュがない場合にのみ読み込む
+def _install_chromedriver():
+    from webdriver_manager.chrome import ChromeDriverManager
+    return ChromeDriverManager().install()
+
+def _install_geckodriver():
+    from webdriver_manager.firefox import GeckoDriverManager
+    return GeckoDriverManager().install()
+
+def _install_edgedriver():
+    from webdriver_manager.microsoft import EdgeChromiumDriverManager
+    return EdgeChromiumDriverManager().install()
+
 class DiscordSeleniumManager:
     """SeleniumによるDiscordの操作を管理するクラス"""
     
@@ -30,16 +84,100 @@ class DiscordSeleniumManager:
         self.config = config
         self.driver = None
         self.logged_in = False
+        # 直近の処理で各待機に実際にかかった秒数
+        self.wait_times = {}
+    
+    def _wait_until(self, name, timeout, condition):
+        """
+        条件を満たすまで上限秒数まで待機し、実際の待機時間を記録する
+        
+        Args:
+            name (str): 待機の名前（wait_timesのキー）
+            timeout (float): 待機の上限秒数
+            condition (callable): driverを受け取り真偽値を返す関数
+            
+        Returns:
+            bool: 上限内に条件を満たしたかどうか
+        """
+        start_time = time.perf_counter()
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=0.1).until(condition)
+            satisfied = True
+        except TimeoutException:
+            satisfied = False
+        self.wait_times[name] = time.perf_counter() - start_time
+        metrics.observe('phase_seconds', self.wait_times[name], phase=f'selenium.wait.{name}')
+        tracing.record(f'selenium.wait.{name}', start_time, self.wait_times[name], satisfied=satisfied)
+        if not satisfied:
+            metrics.inc('wait_timeouts_total', wait=name)
+        logger.debug(f"待機 {name}: {self.wait_times[name]:.2f}秒（{'完了' if satisfied else 'タイムアウト'}）")
+        return satisfied
+    
+    def _unread_markers_gone(self, driver):
+        return not driver.find_elements(By.CSS_SELECTOR, UNREAD_MARKER_SELECTOR)
+
+    def _apply_lean_options(self, browser_name, options):
+        """画像・メディア・フォントの読み込みとアニメーションを抑え、メモリとキャッシュを制限する"""
+        memory_mb = int(self.config.get('lean_memory_mb', DEFAULT_LEAN_MEMORY_MB))
+        cache_mb = int(self.config.get('lean_cache_mb', DEFAULT_LEAN_CACHE_MB))
+        
+        if browser_name == 'firefox':
+            options.set_preference('permissions.default.image', 2)
+            options.set_preference('image.animation_mode', 'none')
+            options.set_preference('media.autoplay.default', 5)
+            options.set_preference('gfx.downloadable_fonts.enabled', False)
+            options.set_preference('ui.prefersReducedMotion', 1)
+            options.set_preference('browser.cache.disk.enable', False)
+            options.set_preference('browser.cache.memory.capacity', cache_mb * 1024)
+            options.set_preference('browser.sessionhistory.max_total_viewers', 0)
+            options.set_preference('dom.ipc.processCount', 2)
+            # JavaScriptヒープの上限（KB単位。Chromium系の--max-old-space-sizeに相当）
+            options.set_preference('javascript.options.mem.max', memory_mb * 1024)
+            return
+        
+        # Chrome / Edge（Chromium系）
+        options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.default_content_setting_values.notifications': 2
+        })
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        options.add_argument('--autoplay-policy=user-gesture-required')
+        options.add_argument('--force-prefers-reduced-motion')
+        options.add_argument('--disable-remote-fonts')
+        options.add_argument('--disable-background-networking')
+        options.add_argument('--renderer-process-limit=2')
+        options.add_argument(f'--disk-cache-size={cache_mb * 1024 * 1024}')
+        options.add_argument(f'--media-cache-size={cache_mb * 1024 * 1024}')
+        options.add_argument(f'--js-flags=--max-old-space-size={memory_mb}')
+    
+    def _block_heavy_resources(self):
+        """Chromium系ブラウザでDevToolsプロトコルを使い、重いリソースへのリクエストを遮断する"""
+        try:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': LEAN_BLOCKED_URLS})
+        except Exception as e:
+            logger.warning(f"リソースの遮断を設定できませんでした: {e}")
     
+    @metrics.instrument('selenium.init_driver')
     def init_driver(self):
         """Seleniumドライバを初期化する"""
         browser_name = self.config.get('browser', 'chrome').lower()
         headless = self.config.get('headless', 'true').lower() == 'true'
+        profile_dir = self.config.get('browser_profile_dir')
+        lean = self.config.get('lean_browser', False)
         
         logger.info(f"{browser_name}ブラウザを初期化しています...")
         
         try:
+            if profile_dir:
+                # ログイン状態を次回起動時に引き継ぐためのプロファイルディレクトリ
+                profile_dir = os.path.abspath(profile_dir)
+                os.makedirs(profile_dir, exist_ok=True)
+                logger.info(f"ブラウザプロファイルを使用します: {profile_dir}")
+            
+            # ドライバの取得とServiceは使用するブラウザの分だけ読み込む
             if browser_name == 'chrome':
+                from selenium.webdriver.chrome.service import Service as ChromeService
                 options = webdriver.ChromeOptions()
                 if headless:
                     options.add_argument('--headless')
@@ -51,28 +189,43 @@ class DiscordSeleniumManager:
                 options.add_argument('--disable-infobars')
                 options.add_experimental_option('excludeSwitches', ['enable-logging'])
                 options.add_argument('--mute-audio')
+                if profile_dir:
+                    options.add_argument(f'--user-data-dir={profile_dir}')
+                if lean:
+                    self._apply_lean_options(browser_name, options)
                 
                 # Service オブジェクトを作成
-                service = ChromeService(ChromeDriverManager().install())
+                service = ChromeService(resolve_driver_path('chrome', _install_chromedriver, self.config))
                 self.driver = webdriver.Chrome(service=service, options=options)
                 
             elif browser_name == 'firefox':
+                from selenium.webdriver.firefox.service import Service as FirefoxService
                 options = webdriver.FirefoxOptions()
                 if headless:
                     options.add_argument('--headless')
+                if profile_dir:
+                    options.add_argument('-profile')
+                    options.add_argument(profile_dir)
+                if lean:
+                    self._apply_lean_options(browser_name, options)
                 
                 # Service オブジェクトを作成
-                service = FirefoxService(GeckoDriverManager().install())
+                service = FirefoxService(resolve_driver_path('firefox', _install_geckodriver, self.config))
                 self.driver = webdriver.Firefox(service=service, options=options)
                 
             elif browser_name == 'edge':
+                from selenium.webdriver.edge.service import Service as EdgeService
                 options = webdriver.EdgeOptions()
                 if headless:
                     options.add_argument('--headless')
                 options.add_argument('--disable-gpu')
+                if profile_dir:
+                    options.add_argument(f'--user-data-dir={profile_dir}')
+                if lean:
+                    self._apply_lean_options(browser_name, options)
                 
                 # Service オブジェクトを作成
-                service = EdgeService(EdgeChromiumDriverManager().install())
+                service = EdgeService(resolve_driver_path('edge', _install_edgedriver, self.config))
                 self.driver = webdriver.Edge(service=service, options=options)
             
             else:
@@ -82,6 +235,11 @@ class DiscordSeleniumManager:
             # ウィンドウサイズを設定
             self.driver.set_window_size(1280, 800)
             
+            if lean:
+                if browser_name in ('chrome', 'edge'):
+                    self._block_heavy_resources()
+                logger.info("軽量プロファイルを適用しました")
+            
             logger.info(f"ブラウザを正常に初期化しました: {browser_name}")
             return True
             
@@ -89,6 +247,24 @@ class DiscordSeleniumManager:
             logger.error(f"ブラウザの初期化中にエラーが発生しました: {e}")
             return False
     
+    def has_saved_session(self):
+        """
+        保存済みのセッション（プロファイル）でログイン済みかどうかを確認する
+        
+        未ログインの場合、Discordは/channels/@meからログインページにリダイレクトする。
+        """
+        self.driver.get(f'{WEB_BASE_URL}/channels/@me')
+        timeout = float(self.config.get('session_check_timeout', DEFAULT_SESSION_CHECK_TIMEOUT))
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=0.2).until(
+                lambda driver: '/login' in driver.current_url
+                or driver.find_elements(By.CSS_SELECTOR, LOGGED_IN_SELECTOR)
+            )
+        except TimeoutException:
+            return False
+        return '/login' not in self.driver.current_url
+    
+    @metrics.instrument('selenium.login')
     def login(self):
         """Discordにログインする"""
         if not self.driver:
@@ -96,8 +272,14 @@ class DiscordSeleniumManager:
                 return False
         
         try:
+            # プロファイルにセッションが残っていればフォームでのログインを省略する
+            if self.config.get('browser_profile_dir') and self.has_saved_session():
+                logger.info("保存済みのセッションでログインしました")
+                self.logged_in = True
+                return True
+            
             logger.info("Discordログイン処理を開始します...")
-            self.driver.get('https://discord.com/login')
+            self.driver.get(f'{WEB_BASE_URL}/login')
             
             # ページの読み込みを待つ
             WebDriverWait(self.driver, 10).until(
@@ -142,13 +324,14 @@ class DiscordSeleniumManager:
             logger.error(f"ログイン中にエラーが発生しました: {e}")
             return False
     
+    @metrics.instrument('selenium.navigate_to_channel')
     def navigate_to_channel(self, server_id, channel_id):
         """指定したチャンネルに移動する"""
         if not self.logged_in and not self.login():
             return False
         
         try:
-            channel_url = f"https://discord.com/channels/{server_id}/{channel_id}"
+            channel_url = f"{WEB_BASE_URL}/channels/{server_id}/{channel_id}"
             logger.info(f"チャンネルに移動しています: {channel_url}")
             
             self.driver.get(channel_url)
@@ -158,8 +341,13 @@ class DiscordSeleniumManager:
                 lambda driver: 'channels/' in driver.current_url
             )
             
-            # 少し待機してページが完全にロードされるのを待つ
-            time.sleep(3)
+            # メッセージ一覧が描画されるまで待つ
+            if not self._wait_until(
+                'page_ready',
+                float(self.config.get('page_ready_timeout', DEFAULT_PAGE_READY_TIMEOUT)),
+                EC.presence_of_element_located((By.CSS_SELECTOR, MESSAGE_LIST_SELECTOR))
+            ):
+                logger.warning("メッセージ一覧の描画を確認できませんでしたが、処理を続行します")
             
             logger.info("チャンネルに正常に移動しました")
             return True
@@ -171,75 +359,55 @@ class DiscordSeleniumManager:
             logger.error(f"チャンネル移動中にエラーが発生しました: {e}")
             return False
     
+    @metrics.instrument('selenium.find_and_click_read_button')
     def find_and_click_read_button(self):
         """既読ボタンを見つけてクリックする"""
         try:
-            # 様々な方法でボタンを探す
-            wait = WebDriverWait(self.driver, 5)
+            # ページ内のボタンを1回のスクリプト実行でまとめて調べる（ボタンがなければ待たずに終了）
+            button = self.driver.execute_script(FIND_READ_BUTTON_SCRIPT)
+            if button is None:
+                logger.info("既読ボタンが見つかりませんでした")
+                return False
             
-            # 方法1: テキストで検索（XPath）
+            logger.info("既読ボタンを見つけました")
             try:
-                button = wait.until(EC.element_to_be_clickable((By.XPATH, '//button[contains(text(), "既読にする")]')))
-                logger.info("既読ボタン（テキスト検索）を見つけました")
                 button.click()
-                return True
-            except:
-                pass
-            
-            # 方法2: クラス名とテキストの組み合わせ
-            try:
-                button = self.driver.find_element(By.XPATH, '//button[contains(@class, "barButtonAlt") and contains(text(), "既読にする")]')
-                if button.is_displayed() and button.is_enabled():
-                    logger.info("既読ボタン（クラス+テキスト検索）を見つけました")
-                    button.click()
-                    return True
-            except:
-                pass
-            
-            # 方法3: SVGアイコンを含むボタンを探す
-            try:
-                button = self.driver.find_element(By.XPATH, '//button[contains(@class, "barButton") and .//svg]')
-                if button.is_displayed() and button.is_enabled() and "既読" in button.text:
-                    logger.info("既読ボタン（SVG検索）を見つけました")
-                    button.click()
-                    return True
-            except:
-                pass
-            
-            # 方法4: すべてのボタンを検索してテキストをチェック
-            try:
-                buttons = self.driver.find_elements(By.TAG_NAME, "button")
-                for button in buttons:
-                    if button.is_displayed() and button.is_enabled() and "既読" in button.text:
-                        logger.info("既読ボタン（全ボタン検索）を見つけました")
-                        button.click()
-                        return True
-            except:
-                pass
-            
-            logger.info("既読ボタンが見つかりませんでした")
-            return False
+            except Exception:
+                # 他の要素に遮られている場合はスクリプトからクリックする
+                self.driver.execute_script("arguments[0].click();", button)
+            return True
             
         except Exception as e:
             logger.error(f"既読ボタンの検索中にエラーが発生しました: {e}")
             return False
 
+    @metrics.instrument('selenium.mark_as_read')
     def mark_as_read(self, server_id, channel_id):
         """チャンネルを既読状態にする"""
+        self.wait_times = {}
         try:
             if not self.navigate_to_channel(server_id, channel_id):
                 return False
             
             # チャンネルに移動して画面を表示するだけで既読になる
-            # 少し待機して既読処理が完了するのを待つ
-            time.sleep(3)
+            # 未読の区切り線が消えるまで待つ
+            self._wait_until(
+                'read_state',
+                float(self.config.get('read_state_timeout', DEFAULT_READ_STATE_TIMEOUT)),
+                self._unread_markers_gone
+            )
             
             # 「既読にする」ボタンを探してクリックする
             button_clicked = self.find_and_click_read_button()
             
             if button_clicked:
                 logger.info("既読ボタンをクリックしました")
-                time.sleep(2)  # クリック後の処理を待つ
+                # クリック後に未読表示が消えるのを待つ
+                self._wait_until(
+                    'click_settle',
+                    float(self.config.get('click_settle_timeout', DEFAULT_CLICK_SETTLE_TIMEOUT)),
+                    self._unread_markers_gone
+                )
             else:
                 logger.info("既読ボタンが見つかりませんでした。チャンネルは既に既読状態の可能性があります。")
             
@@ -270,12 +438,32 @@ class DiscordSeleniumManager:
             except:
                 logger.info(f"チャンネル ID:{channel_id} を既読にしました")
             
+            if self.wait_times:
+                logger.info("待機時間: " + ", ".join(f"{name}={elapsed:.2f}秒" for name, elapsed in self.wait_times.items()))
             return True
             
         except Exception as e:
             logger.error(f"既読処理中にエラーが発生しました: {e}")
             return False
     
+    def is_alive(self):
+        """ブラウザが応答するかどうかを確認する"""
+        if not self.driver:
+            return False
+        try:
+            self.driver.current_url
+            return True
+        except Exception:
+            return False
+    
+    @tracing.traced('selenium.restart')
+    def restart(self):
+        """ブラウザを閉じて起動し直し、再ログインする"""
+        logger.warning("ブラウザを再起動しています...")
+        self.close()
+        return self.login()
+    
+    @tracing.traced('selenium.close')
     def close(self):
         """ブラウザを閉じる"""
         if self.driver:
@@ -0,0 +1,189 @@
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager, nullcontext
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# 無効時にspan()が返す共有のコンテキスト（何もしない）
+_NULL_SPAN = nullcontext()
+
+_tracer = None
+
+class Tracer:
+    """
+    スパンをChromeのトレースイベント形式（JSON配列）でファイルに書き出すクラス
+
+    イベントは発生するたびに追記するため、途中で異常終了しても
+    それまでのタイムラインをchrome://tracingやPerfettoで開くことができる。
+    """
+
+    def __init__(self, path):
+        """
+        コンストラクタ
+
+        Args:
+            path (str): 出力先ファイルのパス
+        """
+        self.path = path
+        self.pid = os.getpid()
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._file = open(path, 'w')
+        self._file.write('[\n')
+        self._named_tids = set()
+        # タスクごとのトラック番号（終了したタスクの分は_forget_taskで削除する）
+        self._task_tids = weakref.WeakKeyDictionary()
+        self._next_task_tid = 1_000_000
+
+    def _tid(self):
+        """スレッド（asyncioのタスク内ではタスク）ごとのトラック番号を返す"""
+        # get_native_idとTask.get_nameはPython 3.8以降のため、3.7では代わりの値を使う
+        tid = getattr(threading, 'get_native_id', threading.get_ident)()
+        name = threading.current_thread().name
+        # asyncioが読み込まれていなければタスク内ではない（トレースのためだけに読み込まない）
+        asyncio = sys.modules.get('asyncio')
+        try:
+            task = asyncio.current_task() if asyncio else None
+        except RuntimeError:
+            task = None
+        if task is not None:
+            # 同じスレッド上で並行するタスクのスパンが重ならないよう、タスクごとにトラックを分ける
+            # 終了したタスクの番号は再利用しない（別のタスクが同じトラックと名前を引き継がないため）
+            tid = self._task_tids.get(task)
+            if tid is None:
+                tid = self._task_tids[task] = self._next_task_tid
+                self._next_task_tid += 1
+                task.add_done_callback(self._forget_task)
+            get_name = getattr(task, 'get_name', None)
+            name = get_name() if get_name else f"Task-{tid - 1_000_000 + 1}"
+        if tid not in self._named_tids:
+            self._named_tids.add(tid)
+            self._write({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid, 'args': {'name': name}})
+        return tid
+
+    def _forget_task(self, task):
+        """終了したタスクのトラック番号を破棄する（長時間のgatewayモードでも記録が増え続けないようにする）"""
+        with self._lock:
+            tid = self._task_tids.pop(task, None)
+            if tid is not None:
+                self._named_tids.discard(tid)
+
+    def _write(self, event):
+        self._file.write(json.dumps(event, ensure_ascii=False, default=str) + ',\n')
+
+    def _ts(self, perf_time):
+        return round((perf_time - self._origin) * 1_000_000, 1)
+
+    def complete(self, name, start_time, duration, args=None):
+        """開始時刻（perf_counter）と所要時間（秒）から完了済みのスパンを記録する"""
+        event = {'name': name, 'cat': name.split('.', 1)[0], 'ph': 'X', 'pid': self.pid,
+                 'ts': self._ts(start_time), 'dur': round(duration * 1_000_000, 1)}
+        if args:
+            event['args'] = args
+        with self._lock:
+            if self._file.closed:
+                return
+            event['tid'] = self._tid()
+            self._write(event)
+
+    def instant(self, name, args=None):
+        """時間幅を持たないイベント（429の受信など）を記録する"""
+        event = {'name': name, 'cat': name.split('.', 1)[0], 'ph': 'i', 's': 't', 'pid': self.pid,
+                 'ts': self._ts(time.perf_counter())}
+        if args:
+            event['args'] = args
+        with self._lock:
+            if self._file.closed:
+                return
+            event['tid'] = self._tid()
+            self._write(event)
+
+    def close(self):
+        """ファイルを閉じる（JSON配列を閉じて正しいJSONにする）"""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(json.dumps({'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'args': {'name': 'discord_reader'}}) + '\n]\n')
+            self._file.close()
+
+def start(path):
+    """
+    トレースを開始する
+
+    Args:
+        path (str): 出力先ファイルのパス
+    """
+    global _tracer
+    stop()
+    _tracer = Tracer(path)
+    logger.info(f"トレースを記録します: {path}")
+    return _tracer
+
+def stop():
+    """トレースを終了してファイルを閉じる"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.close()
+        logger.info(f"トレースを書き出しました: {tracer.path}")
+
+def enabled():
+    return _tracer is not None
+
+def record(name, start_time, duration, **args):
+    """計測済みの区間をスパンとして記録する（無効時は何もしない）"""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.complete(name, start_time, duration, args)
+
+def instant(name, **args):
+    """時間幅を持たないイベントを記録する（無効時は何もしない）"""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.instant(name, args)
+
+@contextmanager
+def _span(tracer, name, args):
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        tracer.complete(name, start_time, time.perf_counter() - start_time, args)
+
+def span(name, **args):
+    """
+    ブロックをスパンとして記録するコンテキストマネージャーを返す
+
+    無効時は共有の何もしないコンテキストを返す。
+
+    Args:
+        name (str): スパン名（"main.sweep"など）
+        **args: スパンに付与する引数
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return _span(tracer, name, args)
+
+def traced(name):
+    """関数の呼び出しをスパンとして記録するデコレータ"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return func(*args, **kwargs)
+            start_time = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                tracer.complete(name, start_time, time.perf_counter() - start_time)
+        return wrapper
+    return decorator